@@ -0,0 +1,4 @@
+'''Package size and weight calculations of the ESPCO Calculator, usable without the tkinter
+window (scripts, batch runs, services).'''
+
+from .engine import CATALOG, MULTIPLE_PACKAGING, Item, OrderState, Product, SizingResult, select_package, size_order
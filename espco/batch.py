@@ -0,0 +1,238 @@
+'''Sizes a whole export of orders from the command line, one order at a time, so the memory used
+does not grow with the size of the file:
+
+    python -m espco.batch orders.csv -o results.csv
+
+Orders can come in a CSV or a JSONL file (picked by the file extension, or --input-format):
+
+    CSV with one line per item:    order_id,sku,quantity
+    CSV with one line per order:   order_id,wh_12,sauce,... (a column for every SKU, with quantities)
+    JSONL with one line per order: {"order_id": "1001", "items": {"wh_12": 1, "sauce": 2}}
+    JSONL with one line per item:  {"order_id": "1001", "sku": "wh_12", "quantity": 1}
+
+Lines of the same order must be next to each other (which is how exports come out).  Every order
+gets a line in the results with its package size, weight and whether it needs multiple packaging
+(--split also gives the boxes to split those in, see split.py), and the orders/sec are reported at
+the end.  Repeated baskets are sized once (see cache.py), and --workers spreads the orders over
+several processes (see parallel.py).  Changes to the catalog file are picked up every RELOAD_EVERY
+orders without stopping the run.'''
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+from . import engine, instrument, parallel
+from .cache import SizingCache
+from .precompiled import DecisionTable
+from .split import split_order
+
+FIELDS = ["order_id", "package", "weight", "lb", "oz", "multiple", "error"]
+SPLIT_FIELDS = FIELDS + ["boxes"]
+
+def parse_quantity(text):
+    '''The quantity of a line of a CSV file: the whole number in the text, or the text itself if it
+    isn't one (see add_line()).'''
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+def add_line(items, sku, quantity):
+    '''Adds the quantity of a line to the SKU of an order.  A quantity that is not a whole number
+    over 0 (engine.is_quantity()) is kept as it is instead of being added up, so the order gets an
+    error in the results when it is sized instead of stopping the whole run.'''
+    before = items.get(sku)
+    if before is None:
+        items[sku] = quantity
+    elif engine.is_quantity(before):
+        items[sku] = before + quantity if engine.is_quantity(quantity) else quantity
+
+def _group(rows):
+    '''Joins consecutive (order_id, sku, quantity) rows into (order_id, items) orders.'''
+    order_id = None
+    items = {}
+    for row_id, sku, quantity in rows:
+        if row_id != order_id and items:
+            yield order_id, items
+            items = {}
+        order_id = row_id
+        add_line(items, sku, quantity)
+    if items:
+        yield order_id, items
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    columns = reader.fieldnames or []
+    if "sku" in columns:
+        return _group((row["order_id"], row["sku"].strip(), parse_quantity(row.get("quantity") or 1)) for row in reader)
+    skus = [column for column in columns if column != "order_id"]
+    return ((row["order_id"], {sku: parse_quantity(row[sku]) for sku in skus if row[sku] and row[sku] != "0"})
+            for row in reader)
+
+def read_jsonl(lines):
+    def rows():
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "items" in record:
+                #a whole order in one line, given out as a group of its own
+                yield record["order_id"], None, record["items"]
+            else:
+                yield record["order_id"], record["sku"], record.get("quantity", 1)
+    order_id = None
+    items = {}
+    for row_id, sku, quantity in rows():
+        if (row_id != order_id or sku is None) and items:
+            yield order_id, items
+            items = {}
+        order_id = row_id
+        if sku is None:
+            yield row_id, quantity
+        else:
+            add_line(items, sku, quantity)
+    if items:
+        yield order_id, items
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+RELOAD_EVERY = 1000 #orders between checks of the catalog file
+
+def reload_catalog():
+    '''Loads the catalog file again if it changed (see engine.reload_catalog()).  A catalog file
+    that can't be loaded is reported and the rules in use are kept.'''
+    try:
+        if engine.reload_catalog():
+            print("catalog reloaded from %s" % engine.catalog_file, file = sys.stderr)
+    except (OSError, ValueError) as error:
+        print("catalog not reloaded: %s" % error, file = sys.stderr)
+
+def size_orders(orders, sizer = engine.size_order):
+    '''Yields (order_id, items, result, error) for every (order_id, items) order.  Orders with SKUs
+    that are not in the catalog or quantities that are not whole numbers over 0 get no result and
+    the error instead of stopping the whole run.'''
+    for count, (order_id, items) in enumerate(orders):
+        if count % RELOAD_EVERY == 0:
+            reload_catalog()
+        try:
+            yield order_id, items, sizer(items), ""
+        except KeyError as error:
+            yield order_id, items, None, "unknown SKU %s" % error
+        except (ValueError, TypeError) as error:
+            yield order_id, items, None, str(error)
+
+def describe_split(items):
+    '''The boxes an order that needs multiple packaging can be split in (see split.py), as text:
+    "Case 1 (16x13x10): wh_24 + tb_48; 12x12x10 Box: wh_24".'''
+    return "; ".join("%s: %s" % (result.package.replace("Package: ", ""), " + ".join(skus))
+                     for result, skus in split_order(items).boxes)
+
+def result_row(order_id, result, error, items = None):
+    '''The line of the results of an order, with the boxes to split it in if items are given.'''
+    if result is None:
+        row = {"order_id": order_id, "package": "", "weight": "", "lb": "", "oz": "", "multiple": "", "error": error}
+    else:
+        row = {"order_id": order_id, "package": result.package, "weight": result.weight, "lb": result.lb,
+               "oz": result.oz, "multiple": result.multiple, "error": error}
+    if items is not None:
+        row["boxes"] = describe_split(items) if result is not None and result.multiple else ""
+    return row
+
+class CSVWriter():
+    def __init__(self, out, fields = FIELDS):
+        self.writer = csv.DictWriter(out, fields, lineterminator = "\n")
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+class JSONLWriter():
+    def __init__(self, out, fields = FIELDS):
+        self.out = out
+
+    def write(self, row):
+        self.out.write(json.dumps(row) + "\n")
+
+WRITERS = {"csv": CSVWriter, "jsonl": JSONLWriter}
+
+def file_format(path, given):
+    if given:
+        return given
+    if path.endswith(".jsonl") or path.endswith(".json"):
+        return "jsonl"
+    return "csv"
+
+def make_sizer(cache_size = 0, decision_table = None):
+    '''The function the orders are sized with, and the SizingCache in front of it (None for no cache).'''
+    sizer = DecisionTable.load(decision_table).size_order if decision_table else engine.size_order
+    if cache_size > 0:
+        sizes = SizingCache(cache_size, sizer)
+        return sizes.size_order, sizes
+    return sizer, None
+
+def run(orders, writer, sizer = engine.size_order, split = False):
+    '''Sizes every order and writes its result as it goes, returns how many orders were sized.'''
+    count = 0
+    for order_id, items, result, error in size_orders(orders, sizer):
+        writer.write(result_row(order_id, result, error, items if split else None))
+        count += 1
+    return count
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog = "python -m espco.batch", description = "Size every order of an order export.")
+    parser.add_argument("input", help = "CSV or JSONL file with the orders, - for stdin")
+    parser.add_argument("-o", "--output", default = "-", help = "where the results are written, - for stdout (default)")
+    parser.add_argument("--input-format", choices = sorted(READERS))
+    parser.add_argument("--output-format", choices = sorted(WRITERS))
+    parser.add_argument("--cache-size", type = int, default = 4096,
+                        help = "how many different baskets to keep the results of, 0 for no cache (default 4096)")
+    parser.add_argument("--decision-table", help = "look packages up in a table compiled with python -m espco.precompiled")
+    parser.add_argument("--split", action = "store_true",
+                        help = "add the boxes orders that need multiple packaging can be split in (boxes column)")
+    parser.add_argument("--workers", type = int, default = 1, help = "processes sizing the orders (default 1, no extra processes)")
+    parser.add_argument("--profile", metavar = "FILE",
+                        help = "time the sizing stages (see instrument.py) and write the stats to FILE (without --workers)")
+    parser.add_argument("--chunk-size", type = int, default = 2000, help = "orders given to a worker at a time (default 2000)")
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    args = parse_args(argv)
+    input_format = file_format(args.input, args.input_format)
+    output_format = file_format(args.output, args.output_format)
+    source = sys.stdin if args.input == "-" else open(args.input, newline = "")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline = "")
+    sizes = None
+    if args.profile:
+        instrument.enable()
+    start = time.perf_counter()
+    try:
+        orders = READERS[input_format](source)
+        writer = WRITERS[output_format](out, SPLIT_FIELDS if args.split else FIELDS)
+        if args.workers > 1:
+            count, workers = parallel.run(orders, writer, args.workers, args.chunk_size, args.cache_size,
+                                          args.decision_table, args.split)
+        else:
+            sizer, sizes = make_sizer(args.cache_size, args.decision_table)
+            count = run(orders, writer, sizer, args.split)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print("%d orders in %.2f s (%.0f orders/sec)" % (count, elapsed, count / elapsed if elapsed else 0), file = sys.stderr)
+    if args.workers > 1:
+        for pid, (orders, busy) in sorted(workers.items()):
+            print("  worker %d: %d orders in %.2f s (%.0f orders/sec)" % (pid, orders, busy, orders / busy if busy else 0),
+                  file = sys.stderr)
+    if sizes:
+        print("cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions" % sizes.stats(), file = sys.stderr)
+    if args.profile:
+        print(instrument.report(), file = sys.stderr)
+        instrument.dump(args.profile)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+'''Benchmarks of the sizing engine on synthetic streams of orders, so a change to the rules or to the
+engine can be measured before and after:
+
+    python -m espco.benchmark -o before.json
+    ...change the engine...
+    python -m espco.benchmark -o after.json --compare before.json
+
+Orders are made up from the catalog with a fixed seed, so every run sizes the same orders:
+
+    single      one pretzel pack, sauce or gift box
+    basket      a few pretzel packs with sauces, salts and waffles
+    holiday     two to five gift boxes, with or without some pretzels
+    wholesale   twenty to sixty pretzel packs and sauces (needs multiple packaging)
+
+and for every stream it measures the latency of sizing one order (engine.size_order(), p50/p99 in
+microseconds), the throughput of sizing the whole stream (orders/sec, also with the SizingCache
+and with the vectorized sizer if NumPy is installed) and the memory allocated while sizing an order
+(tracemalloc peak, bytes).  Results are written as JSON with the commit they were run on, and
+--compare reports every measure that got worse than the given results by more than --tolerance.'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from . import engine
+from .cache import SizingCache
+
+def _skus():
+    '''SKUs of the catalog by kind: pretzel packs, sauces, salts and toppers, waffles and gift boxes.'''
+    kinds = {"pretzels": [], "sauces": [], "salts": [], "waffles": [], "gift_boxes": []}
+    for sku, product in engine.CATALOG.items():
+        item = getattr(product, "item", None)
+        if product.gift_box_code:
+            kinds["gift_boxes"].append(sku)
+        elif item is engine.ITEMS.get("mustard"):
+            kinds["sauces"].append(sku)
+        elif item is engine.ITEMS.get("salt"):
+            kinds["salts"].append(sku)
+        elif item is engine.ITEMS.get("waffle"):
+            kinds["waffles"].append(sku)
+        else:
+            kinds["pretzels"].append(sku)
+    return kinds
+
+def single_orders(count, seed = 1):
+    rng, kinds = random.Random(seed), _skus()
+    skus = kinds["pretzels"] + kinds["sauces"] + kinds["gift_boxes"]
+    return [{rng.choice(skus): 1} for _ in range(count)]
+
+def basket_orders(count, seed = 1):
+    rng, kinds = random.Random(seed), _skus()
+    orders = []
+    for _ in range(count):
+        order = {}
+        for sku in rng.choices(kinds["pretzels"], k = rng.randint(1, 4)) + rng.choices(kinds["sauces"], k = rng.randint(1, 3)):
+            order[sku] = order.get(sku, 0) + 1
+        if rng.random() < .3:
+            order[rng.choice(kinds["salts"])] = rng.randint(1, 2)
+        if rng.random() < .2:
+            order[rng.choice(kinds["waffles"])] = 1
+        orders.append(order)
+    return orders
+
+def holiday_orders(count, seed = 1):
+    rng, kinds = random.Random(seed), _skus()
+    orders = []
+    for _ in range(count):
+        order = {}
+        for sku in rng.choices(kinds["gift_boxes"], k = rng.randint(2, 5)):
+            order[sku] = order.get(sku, 0) + 1
+        if rng.random() < .5:
+            order[rng.choice(kinds["pretzels"])] = 1
+        orders.append(order)
+    return orders
+
+def wholesale_orders(count, seed = 1):
+    rng, kinds = random.Random(seed), _skus()
+    orders = []
+    for _ in range(count):
+        order = {}
+        for sku in rng.choices(kinds["pretzels"] + kinds["sauces"], k = rng.randint(20, 60)):
+            order[sku] = order.get(sku, 0) + 1
+        orders.append(order)
+    return orders
+
+STREAMS = {"single": single_orders, "basket": basket_orders, "holiday": holiday_orders, "wholesale": wholesale_orders}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def latency(orders):
+    '''p50, p99 and mean microseconds of sizing one order.'''
+    times = []
+    for order in orders:
+        start = time.perf_counter_ns()
+        engine.size_order(order)
+        times.append(time.perf_counter_ns() - start)
+    return {"p50_us": percentile(times, .5) / 1000, "p99_us": percentile(times, .99) / 1000,
+            "mean_us": sum(times) / len(times) / 1000}
+
+REPEAT = 3 #throughputs are the best of this many runs, to leave out runs slowed down by something else
+
+def throughput(orders, sizer):
+    '''Orders/sec of sizing every order of the stream with sizer.'''
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for order in orders:
+            sizer(order)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return len(orders) / best
+
+def vectorized_throughput(orders):
+    '''Orders/sec of the vectorized sizer (count matrix included), None if NumPy isn't installed.'''
+    try:
+        from . import vectorized
+    except ImportError:
+        return None
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        vectorized.size_matrix(vectorized.count_matrix(orders))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return len(orders) / best
+
+def memory(orders, sample = 200):
+    '''Mean and biggest tracemalloc peak (bytes) of sizing one order, for a sample of the orders.'''
+    peaks = []
+    tracemalloc.start()
+    try:
+        for order in orders[:sample]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            engine.size_order(order)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return {"mean_bytes": sum(peaks) / len(peaks), "max_bytes": max(peaks)}
+
+def run_stream(orders):
+    #compiles the rules and warms up the interpreter before measuring
+    for order in orders[:1000]:
+        engine.size_order(order)
+    result = {"orders": len(orders), "latency": latency(orders),
+              "throughput": {"orders_per_sec": throughput(orders, engine.size_order),
+                             "cached_orders_per_sec": throughput(orders, SizingCache(4096).size_order)},
+              "memory": memory(orders)}
+    vectorized = vectorized_throughput(orders)
+    if vectorized is not None:
+        result["throughput"]["vectorized_orders_per_sec"] = vectorized
+    return result
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(count = 20000, seed = 1, streams = None):
+    '''Runs the benchmarks of the given streams (all of them by default), returns the results.'''
+    results = {"commit": commit(), "python": platform.python_version(), "platform": platform.platform(),
+               "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "orders": count, "seed": seed, "streams": {}}
+    for name in streams or STREAMS:
+        results["streams"][name] = run_stream(STREAMS[name](count, seed))
+    return results
+
+#measures where higher is better, every other measure is better lower
+HIGHER_IS_BETTER = ("orders_per_sec",)
+
+def compare(results, baseline, tolerance = .25):
+    '''Returns (stream, measure, baseline value, value) of every measure that is worse than in the
+    baseline by more than tolerance (a fraction).'''
+    worse = []
+    for name, stream in results["streams"].items():
+        for group, measures in stream.items():
+            if not isinstance(measures, dict):
+                continue
+            for measure, value in measures.items():
+                old = baseline.get("streams", {}).get(name, {}).get(group, {}).get(measure)
+                if not old:
+                    continue
+                change = value / old - 1
+                if measure.endswith(HIGHER_IS_BETTER):
+                    change = -change
+                if change > tolerance:
+                    worse.append((name, group + "." + measure, old, value))
+    return worse
+
+def report(results, out):
+    for name, stream in results["streams"].items():
+        print("%-9s p50 %6.1f us  p99 %6.1f us  %8.0f orders/sec  %8.0f cached  %5.0f bytes/order" %
+              (name, stream["latency"]["p50_us"], stream["latency"]["p99_us"], stream["throughput"]["orders_per_sec"],
+               stream["throughput"]["cached_orders_per_sec"], stream["memory"]["mean_bytes"]), file = out)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.benchmark", description = "Benchmark the sizing engine.")
+    parser.add_argument("-o", "--output", help = "JSON file the results are written to")
+    parser.add_argument("--orders", type = int, default = 20000, help = "orders in every stream (default 20000)")
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--stream", action = "append", choices = list(STREAMS), help = "only run this stream (can be repeated)")
+    parser.add_argument("--compare", help = "JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type = float, default = .25,
+                        help = "how much worse (fraction) a measure can be than in --compare (default .25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.orders, args.seed, args.stream)
+    report(results, sys.stderr)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent = 2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            worse = compare(results, json.load(baseline_file), args.tolerance)
+        for name, measure, old, value in worse:
+            print("%s %s: %.1f -> %.1f" % (name, measure, old, value), file = sys.stderr)
+        print("%d measures worse than %s" % (len(worse), args.compare), file = sys.stderr)
+        return 1 if worse else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
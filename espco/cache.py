@@ -0,0 +1,68 @@
+'''Most orders are a small set of recurring baskets ("12 Wheelhouse + sauce", a single Saucy box...),
+so SizingCache keeps the results of the last orders sized and gives them back for the same basket
+without going through the sizing rules again:
+
+    sizes = SizingCache(maxsize = 4096)
+    sizes.size_order({"wh_12": 1, "sauce": 1})
+    sizes.hits, sizes.misses, sizes.evictions
+
+Baskets are the same when they have the same SKUs in the same quantities, no matter the order the
+items were added in.  The cache is emptied by itself when the sizing rules change (any Item,
+Product or package table of the engine, see engine.generation).'''
+
+from collections import OrderedDict
+
+from . import engine
+
+def canonical(order):
+    '''The basket of an order as a hashable key: sorted (SKU, quantity) pairs.'''
+    if hasattr(order, "items"):
+        #dicts already have every SKU once, and quantities that are not whole numbers over 0 are
+        #kept so the sizer turns the order down
+        return tuple(sorted(order.items()))
+    quantities = {}
+    for sku in order:
+        quantities[sku] = quantities.get(sku, 0) + 1
+    return tuple(sorted((sku, quantity) for sku, quantity in quantities.items() if quantity))
+
+class SizingCache():
+    '''Least recently used cache of the results of engine.size_order(), holding at most maxsize
+    baskets.  Results are shared between the orders of the same basket, so they must not be
+    changed by who gets them.'''
+    def __init__(self, maxsize = 4096, sizer = engine.size_order):
+        self.maxsize = maxsize
+        self.sizer = sizer
+        self.results = OrderedDict()
+        self.generation = engine.generation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def size_order(self, order):
+        if self.generation != engine.generation:
+            self.clear()
+            self.invalidations += 1
+        key = canonical(order)
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = self.sizer(dict(key))
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last = False)
+            self.evictions += 1
+        return result
+
+    def clear(self):
+        self.results.clear()
+        self.generation = engine.generation
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.results), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,309 @@
+'''Calibrates the space and weight of the items and the space limits of the boxes from a log of real
+shipments (NumPy has to be installed for this module).
+
+The space of every item was found by trying orders in boxes, and the weights drift as pretzels and
+bags change, so instead of guessing new values the log of what was really shipped (the items of
+every order, the box it went in and its weight on the scale) is fitted with least squares:
+
+    weight   the scale weight of every order that went in one box is the weight of its items, plus
+             the weight of the box (and of the boxes of its gift boxes when they were stacked), so
+             the weight of every item and box is the least squares solution of the item counts
+             against the scale weights
+    space    the box an order went in only says its space is within the space limits of that box,
+             so the space of every item is fitted to a target space in the box's limits, starting
+             at the middle and moving it to the closest space in the limits of what the last fit
+             gives, until the fit settles (orders with more than one gift box are left out, their
+             box depends on the inches of the gift boxes, and so are orders more than one box away
+             from the one they went in, which packers used when the right one had run out)
+    limits   with the fitted spaces, every space limit is put where it gets the fewest orders in
+             the wrong box, from the sorted spaces of the orders on each side of it (but the
+             envelope stays at 0, and each limit at least a thousandth over the one before it)
+
+No space or weight is fitted under 0 (the ones that would be are set to 0 and the rest fitted
+again), and items that take no space (salts) are not fitted for space.
+
+The current spaces and limits are kept unless the fitted ones put fewer orders in the wrong box:
+fitted limits are tried with the current spaces and with the fitted ones, and the values that
+change the least are chosen of the ones with the fewest orders in the wrong box, so a log the
+current values already size right changes nothing.
+
+The spaces are fitted in the units of the current space limits (the limits being what gives the
+space of an item any meaning), so the limits only move where the orders say they should.  The
+report gives the fitted values next to the current ones and how many orders get a different box
+than the one they went in with the current values and with the fitted ones:
+
+    python -m espco.calibrate shipments.jsonl
+    python -m espco.calibrate shipments.jsonl --write fitted_catalog.json
+
+The log is JSONL, {"order_id": "1001", "items": {"wh_12": 1, "sauce": 2}, "box": "medium", "weight":
+71.5} (box is a package key of the catalog and weight in oz.), or CSV with the columns order_id, box,
+weight and one column for every SKU with its quantity.'''
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from . import catalog, engine, vectorized
+
+ITERATIONS = 50 #most fits of the space settle in a few iterations
+SETTLED = 1e-6 #largest change of a target space (in space) of a fit that settled
+
+def read_log(lines, csv_log = False):
+    '''Yields (items, box, weight) of every shipment of the log.'''
+    if csv_log:
+        reader = csv.DictReader(lines)
+        skus = [column for column in reader.fieldnames if column not in ("order_id", "box", "weight")]
+        for row in reader:
+            yield {sku: int(row[sku]) for sku in skus if row[sku] and row[sku] != "0"}, row["box"], float(row["weight"])
+        return
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            yield record["items"], record["box"], float(record["weight"])
+
+class Shipments():
+    '''The log as arrays: the count matrix of the orders (vectorized.count_matrix(), with a column
+    for every SKU of skus), the package each order went in (index of engine.PACKAGES) and its scale
+    weight (oz.).'''
+    def __init__(self, records):
+        orders, boxes, weights = [], [], []
+        index = {key: package for package, key in enumerate(engine.PACKAGE_KEYS)}
+        for items, box, weight in records:
+            if box not in index:
+                raise ValueError("%s is not a package of the catalog" % box)
+            orders.append(items)
+            boxes.append(index[box])
+            weights.append(weight)
+        self.skus = vectorized.columns()[0]
+        self.counts = vectorized.count_matrix(orders, self.skus)
+        self.boxes = np.array(boxes, dtype = np.int64)
+        self.weights = np.array(weights)
+
+def item_matrix(skus):
+    '''SKU x item matrix of how many of each item (engine.ITEMS) every product of skus is made of, and the
+    space and weight of every product that are not of items (the products that are not packs, and
+    the packaging of the packs).'''
+    items = list(engine.ITEMS)
+    position = {id(item): column for column, item in enumerate(engine.ITEMS.values())}
+    made_of = np.zeros((len(skus), len(items)))
+    fixed_space = np.zeros(len(skus))
+    fixed_weight = np.zeros(len(skus))
+    for row, sku in enumerate(skus):
+        product = engine.CATALOG[sku]
+        if isinstance(product, engine.Pack):
+            made_of[row, position[id(product.item)]] = product.count
+            fixed_weight[row] = product.packaging
+        else:
+            fixed_space[row] = product.space + product.gift_box_space
+            fixed_weight[row] = product.weight
+    return items, made_of, fixed_space, fixed_weight
+
+def weight_matrix(shipments, stacked):
+    '''Shipment x item matrix of how many of each item and box the orders that went in one box
+    weigh, the weight (oz.) of those orders that is not of items, and which shipments they are.'''
+    items, made_of, fixed_space, fixed_weight = item_matrix(shipments.skus)
+    one_box = shipments.boxes != engine.MULTIPLE
+    box_items = {id(box): column for column, box in enumerate(engine.ITEMS.values())}
+    matrix = shipments.counts[one_box] @ made_of
+    for package, (name, box) in enumerate(engine.PACKAGES):
+        if box is not None:
+            matrix[:, box_items[id(box)]] += shipments.boxes[one_box] == package
+    gb_box_weight = shipments.counts[one_box] @ np.array([engine.CATALOG[sku].gbweight for sku in shipments.skus])
+    known = shipments.counts[one_box] @ fixed_weight + np.where(stacked[one_box], gb_box_weight, 0)
+    return matrix, known, one_box
+
+def fit_weights(shipments, stacked):
+    '''Least squares weight (oz.) of every item and box, None for the ones no shipment has.'''
+    matrix, known, one_box = weight_matrix(shipments, stacked)
+    return solve(matrix, shipments.weights[one_box] - known, list(engine.ITEMS))
+
+def solve(matrix, target, items):
+    '''{item: least squares value}, None for the items with no count in any row.'''
+    seen = matrix.any(axis = 0)
+    solution = nonnegative(matrix[:, seen], target)
+    values = dict.fromkeys(items)
+    values.update(zip(np.array(items)[seen], solution))
+    return values
+
+def nonnegative(matrix, target):
+    '''Least squares solution with no value under 0 (spaces and weights can't be): the values that
+    come out under 0 are set to 0 and the others fitted again, until none is.'''
+    solution = np.zeros(matrix.shape[1])
+    free = np.ones(matrix.shape[1], dtype = bool)
+    while free.any():
+        values = np.linalg.lstsq(matrix[:, free], target, rcond = None)[0]
+        solution[:] = 0
+        solution[free] = values
+        if (values >= 0).all():
+            break
+        free[free] = values > 0
+    return solution
+
+def space_bounds(packages):
+    '''Lower and upper space of every package of SPACE_PACKAGES (NaN for packages that are not).'''
+    limits = [-np.inf] + list(engine.SPACE_LIMITS)
+    lower = np.full(len(engine.PACKAGES), np.nan)
+    upper = np.full(len(engine.PACKAGES), np.nan)
+    for position, package in enumerate(engine.SPACE_PACKAGES[:-1]):
+        lower[package], upper[package] = limits[position], limits[position + 1]
+    return lower[packages], upper[packages]
+
+def space_positions(packages):
+    '''Position of every package in SPACE_PACKAGES (-1 for packages that are not).'''
+    position = np.full(len(engine.PACKAGES), -1)
+    position[engine.SPACE_PACKAGES] = np.arange(len(engine.SPACE_PACKAGES))
+    return position[packages]
+
+def fit_spaces(shipments, stacked):
+    '''Space of every item fitted to the boxes of the orders that were not stacked.  Returns the
+    spaces, and the boxes and fitted spaces of those orders with which of them were fitted.
+
+    Packers sometimes use another box than the one an order fits in (when it has run out), so
+    orders that end up more than one box away from the one they went in are left out of the next
+    fit, and of the fit of the limits.'''
+    items, made_of, fixed_space, fixed_weight = item_matrix(shipments.skus)
+    lower, upper = space_bounds(shipments.boxes)
+    used = ~stacked & ~np.isnan(lower)
+    lower, upper, boxes = lower[used], upper[used], shipments.boxes[used]
+    matrix = shipments.counts[used] @ made_of
+    known = shipments.counts[used] @ fixed_space
+    #the first box has no lower limit, its orders start at its upper limit
+    target = np.where(np.isinf(lower), upper, (lower + upper) / 2)
+    #items that take no space (salts) keep taking none
+    seen = matrix.any(axis = 0) & np.array([engine.ITEMS[name].space != 0 for name in items])
+    fitted_in = np.ones(len(boxes), dtype = bool)
+    for _ in range(ITERATIONS):
+        solution = nonnegative(matrix[fitted_in][:, seen], (target - known)[fitted_in])
+        fitted = matrix[:, seen] @ solution + known
+        new_target = np.clip(fitted, lower, upper)
+        settled = np.abs(new_target - target).max(initial = 0) < SETTLED
+        target = new_target
+        fitted_in = np.abs(space_positions(space_packages(fitted, engine.SPACE_LIMITS)) - space_positions(boxes)) <= 1
+        if settled:
+            break
+    spaces = {name: 0.0 if engine.ITEMS[name].space == 0 and column.any() else None
+              for name, column in zip(items, matrix.T)}
+    spaces.update(zip(np.array(items)[seen], solution))
+    return spaces, boxes, fitted, fitted_in
+
+def fit_limits(boxes, spaces):
+    '''Every space limit of SPACE_LIMITS put where the fewest orders (boxes and their spaces) get the
+    wrong box: orders that went in a box up to the limit have to be at or under it, the others over.
+    The first limit stays where it is (salts only go in an envelope at 0), and the limits are in
+    whole thousandths of space, each at least one over the one before it, like the catalog needs
+    them (engine.load_catalog()).'''
+    order = np.argsort(spaces)
+    spaces, positions = spaces[order], space_positions(boxes[order])
+    limits = [engine.space_units(engine.SPACE_LIMITS[0])]
+    for limit, current in enumerate(engine.SPACE_LIMITS[1:], 1):
+        under = positions <= limit
+        #wrong orders with the limit right after each sorted space: under ones after it, over ones before
+        wrong = (np.cumsum(~under) + (under.sum() - np.cumsum(under)))
+        if under.all() or not under.any():
+            #no orders on one side of the limit say where it should be
+            fitted = engine.space_units(current)
+        else:
+            #the limit is the biggest space that went in the smaller box, as close to the orders
+            #under it as it can be
+            fitted = engine.space_units(spaces[np.argmin(wrong)])
+        limits.append(max(fitted, limits[-1] + 1))
+    return [limit / engine.SPACE_UNITS for limit in limits]
+
+def space_packages(spaces, limits):
+    '''Package of SPACE_PACKAGES for every space with the limits.'''
+    return np.array(engine.SPACE_PACKAGES)[np.searchsorted(np.array(limits), spaces, side = "left")]
+
+def choose_spaces(boxes, current, fitted, fitted_in):
+    '''(spaces, limits, fitted spaces used, fitted limits used) of the orders that were not stacked
+    (their boxes, and their spaces with the current and the fitted item spaces) that put the fewest
+    of them in the wrong box, the current values first, so fitted values are only used when they do
+    better.'''
+    current_in = np.abs(space_positions(space_packages(current, engine.SPACE_LIMITS)) - space_positions(boxes)) <= 1
+    choices = [(current, list(engine.SPACE_LIMITS), False, False),
+               (current, fit_limits(boxes[current_in], current[current_in]), False, True),
+               (fitted, list(engine.SPACE_LIMITS), True, False),
+               (fitted, fit_limits(boxes[fitted_in], fitted[fitted_in]), True, True)]
+    return min(choices, key = lambda choice: np.count_nonzero(space_packages(choice[0], choice[1]) != boxes))
+
+def calibrate(shipments):
+    '''Fits the log of shipments, returns the report as a dict.'''
+    current_packages, current_tenths = vectorized.size_matrix(shipments.counts, shipments.skus)
+    total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = vectorized.totals(shipments.counts, shipments.skus)
+    stacked = vectorized.stack_rows(gift_box_counter, gift_boxes) >= 0
+    weights = fit_weights(shipments, stacked)
+    spaces, boxes, fitted, fitted_in = fit_spaces(shipments, stacked)
+    not_stacked = ~stacked & ~np.isnan(space_bounds(shipments.boxes)[0])
+    chosen, limits, spaces_used, limits_used = choose_spaces(boxes, total_space[not_stacked] / engine.SPACE_UNITS,
+                                                             fitted, fitted_in)
+    matrix, known, one_box = weight_matrix(shipments, stacked)
+    fitted_weights = matrix @ [item.weight if weights[name] is None else weights[name] for name, item in engine.ITEMS.items()] + known
+    return {"shipments": len(shipments.boxes), "fitted_for_space": int(fitted_in.sum()),
+            "items": {name: {"space": item.space, "fitted_space": spaces[name], "weight": item.weight,
+                             "fitted_weight": weights[name]} for name, item in engine.ITEMS.items()},
+            "space_limits": list(engine.SPACE_LIMITS), "fitted_space_limits": limits,
+            "fitted_spaces_used": spaces_used, "fitted_limits_used": limits_used,
+            "wrong_box": {"current": float(np.mean(current_packages != shipments.boxes)),
+                          "current_not_stacked": float(np.mean(current_packages[not_stacked] != shipments.boxes[not_stacked])),
+                          "fitted_not_stacked": float(np.mean(space_packages(chosen, limits) != boxes))},
+            "weight_rms_oz": {"current": rms(current_tenths[one_box] / engine.WEIGHT_UNITS - shipments.weights[one_box]),
+                              "fitted": rms(fitted_weights - shipments.weights[one_box])}}
+
+def rms(errors):
+    return float(np.sqrt(np.mean(errors ** 2))) if len(errors) else 0.0
+
+def fitted_catalog(report):
+    '''The catalog data with the fitted weights, and the fitted spaces and space limits if they are
+    used (rounded to the units of the engine), for a catalog file to review and use.'''
+    data = catalog.read(engine.catalog_file)[1]
+    for name, values in report["items"].items():
+        space, weight = data["items"][name]
+        if report["fitted_spaces_used"] and values["fitted_space"] is not None:
+            space = round(float(values["fitted_space"]), 3)
+        if values["fitted_weight"] is not None:
+            weight = round(float(values["fitted_weight"]), 1)
+        data["items"][name] = [space, weight]
+    if report["fitted_limits_used"]:
+        data["space_limits"] = [round(float(limit), 3) for limit in report["fitted_space_limits"]]
+    return data
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.calibrate", description = "Fit the item constants to a log of shipments.")
+    parser.add_argument("log", help = "JSONL or CSV log of shipments")
+    parser.add_argument("--write", metavar = "FILE", help = "write a catalog file with the fitted values")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.log, newline = "") as log:
+        shipments = Shipments(read_log(log, args.log.endswith(".csv")))
+    read = time.perf_counter()
+    report = calibrate(shipments)
+    fitted = time.perf_counter()
+
+    print("%d shipments read in %.2f s, fitted in %.2f s (%d for the space)" %
+          (report["shipments"], read - start, fitted - read, report["fitted_for_space"]))
+    print("%-16s %8s %8s %8s %8s" % ("item", "space", "fitted", "weight", "fitted"))
+    for name, values in report["items"].items():
+        print("%-16s %8.3f %8s %8.2f %8s" % (name, values["space"],
+                                             "-" if values["fitted_space"] is None else "%.3f" % values["fitted_space"],
+                                             values["weight"],
+                                             "-" if values["fitted_weight"] is None else "%.2f" % values["fitted_weight"]))
+    print("space limits   %s" % " ".join("%.3f" % limit for limit in report["space_limits"]))
+    print("fitted         %s" % " ".join("%.3f" % limit for limit in report["fitted_space_limits"]))
+    wrong = report["wrong_box"]
+    print("wrong box: %.2f%% of the shipments with the current values (%.2f%% of the ones not stacked), %.2f%% fitted" %
+          (wrong["current"] * 100, wrong["current_not_stacked"] * 100, wrong["fitted_not_stacked"] * 100))
+    print("fitted spaces %s, fitted space limits %s (only used if they put fewer orders in the wrong box)" %
+          ("used" if report["fitted_spaces_used"] else "not used", "used" if report["fitted_limits_used"] else "not used"))
+    print("weight off by %.2f oz. (rms) with the current values, %.2f oz. fitted" %
+          (report["weight_rms_oz"]["current"], report["weight_rms_oz"]["fitted"]))
+    if args.write:
+        with open(args.write, "w", encoding = "utf-8") as out:
+            json.dump(fitted_catalog(report), out, indent = 4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+'''Reads the catalog file (catalog.json): the space and weight of every item and box, the packages
+and their tables, and every product of the calculator.  The engine (espco.engine) builds its sizing
+rules from it, so changing a pretzel weight is a change to catalog.json and not to the code.
+
+Parsing JSON every time the calculator starts is slower than it needs to be, so the first time a
+catalog file is read its contents are saved compiled (marshal, the format Python uses for .pyc
+files) in __pycache__ next to it, and are loaded from there while the catalog file keeps the same
+modification time and size.  Loading the compiled catalog takes well under a millisecond (json is
+not even imported).
+
+The format of catalog.json:
+
+    items             {item: [space, weight]}, pretzels, sauces, boxes...
+    packages          [[key, name shown, box item or null]], null for MULTIPLE_PACKAGING
+    dimensions        {box item: [length, width, height]} in inches, for dimensional weight (see
+                      rates.py); boxes without dimensions are billed on their actual weight
+    space_limits      space limit of each package of space_packages but the last
+    space_packages    package keys for orders with no gift boxes or one gift box
+    gift_box_sizes    vertical inches of each size of gift box
+    gift_box_inches   vertical inches of each row of gift_box_table
+    gift_box_min_space, gift_box_space_limits, gift_box_table
+                      columns and package keys for orders with more than one gift box
+    products          {SKU: {"name", "item", "count", "packaging"}} for packs of an item, or
+                      {SKU: {"name", "space", "gift_box_space", "weight", "gift_box_code", "gbweight"}},
+                      either with "codes": [UPCs] a barcode scanner can read besides the SKU
+    panels            rows of panels of buttons of the window: [[{"title", "buttons": [[SKU, text]],
+                      "pady", "tab", "lazy"}]], panels with "tab" go in tabs of their row and
+                      "lazy" ones are only built the first time their tab is shown
+
+see espco.engine for what every value means.'''
+
+import marshal
+import os
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+CACHE_VERSION = 1 #changes when the compiled format does
+
+def stamp(path = CATALOG_FILE):
+    '''Modification time and size of the catalog file, the compiled catalog is only used if it was
+    compiled from a file with the same stamp.'''
+    status = os.stat(path)
+    return status.st_mtime_ns, status.st_size
+
+def cache_path(path = CATALOG_FILE):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", name + ".marshal")
+
+def compile_catalog(path = CATALOG_FILE):
+    '''Parses the catalog file and saves it compiled, returns (stamp, catalog data).  A catalog that
+    can't be saved (read-only install) is still returned.'''
+    import json #only needed when the catalog file changed
+    file_stamp = stamp(path)
+    with open(path, encoding = "utf-8") as catalog_file:
+        data = json.load(catalog_file)
+    try:
+        os.makedirs(os.path.dirname(cache_path(path)), exist_ok = True)
+        #written to a temporary file and renamed, so a process loading it never sees half of it
+        temporary = cache_path(path) + ".%d" % os.getpid()
+        with open(temporary, "wb") as cache_file:
+            marshal.dump((CACHE_VERSION, file_stamp, data), cache_file)
+        os.replace(temporary, cache_path(path))
+    except OSError:
+        pass
+    return file_stamp, data
+
+def read(path = CATALOG_FILE):
+    '''Returns (stamp, catalog data) of the catalog file, from the compiled catalog if it is up to
+    date.  Raises OSError if the file can't be read and ValueError if it isn't valid JSON.'''
+    try:
+        with open(cache_path(path), "rb") as cache_file:
+            version, file_stamp, data = marshal.load(cache_file)
+        if version == CACHE_VERSION and file_stamp == stamp(path):
+            return file_stamp, data
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return compile_catalog(path)
@@ -0,0 +1,549 @@
+'''The sizing engine calculates the package size and weight of an order without any window.  The
+package size is determined by accumulating the space of each item in the order inside a counter
+(total_space).  If the counter exceeds the space available in a box, it goes up to the next box
+size.  The values for the space available in each box, as well as the space each items takes are
+imaginary numbers that were determined through in-person experimentation packaging different
+items inside different size boxes.
+
+For example, 8 wheelhouse (.28 space) and a sauce (.18 space) fit into a small box (12x12x4),
+so the small box was given a maximum space of 2.42 (.28 * 8 + .18 = 2.42).
+
+The weight of each item and box size was determined by weighing these in person, and every item
+in the order adds its weight to a counter (weight).  Box weight is added at the end once the
+engine knows what box size is needed for the space of the items added, since each box size has a
+different weight.
+
+The space and weight values are the ones found by experimentation (2.42 space, 3.20 oz.), and they
+live in the catalog file (catalog.json, see catalog.py) with the packages and the products, so they
+can be changed without changing the code (box weights include packaging).  The engine adds them up
+as whole numbers of thousandths of space and tenths of oz. (SPACE_UNITS and WEIGHT_UNITS), so that
+totals are exact no matter the order the items were added in, and an order of exactly 2.42 space is
+exactly at the limit of a small box.  Weights are only turned back into oz. to report them: divided
+by 16 to give the lbs. and then divided by modulo of 16 to give the oz. (16 oz. in 1 lb.).
+
+Orders are given to size_order() as a dict of SKU -> quantity (or simply a list of SKUs), where
+every SKU is one of the buttons of the ESPCO Calculator window (see CATALOG below).  It is
+possible that the space and weight values in the catalog will have to be changed in the future
+due to things like change in pretzel weight, how much air is in pretzel bags, etc., and a running
+program picks up the changes to the catalog file with reload_catalog().'''
+
+from bisect import bisect_left
+from numbers import Integral
+
+from . import catalog
+
+SPACE_UNITS = 1000 #space is added up in thousandths (waffles take .134)
+WEIGHT_UNITS = 10 #weight is added up in tenths of oz. (waffles weigh 3.20 oz.)
+
+def space_units(space):
+    return int(round(space * SPACE_UNITS))
+
+def weight_units(weight):
+    return int(round(weight * WEIGHT_UNITS))
+
+'''generation counts the changes made to the sizing rules (Item, Product and the package tables),
+so anything that keeps results around (like cache.SizingCache) can tell when they are outdated.
+Changing an attribute of an Item or Product, or changing a table in place, counts by itself.
+rules_changed() has to be called after replacing a whole table.'''
+generation = 0
+
+def rules_changed():
+    global generation
+    generation += 1
+
+class Rules():
+    '''Base of the objects the sizing rules are made of, every attribute change counts as a change
+    of the rules.'''
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        rules_changed()
+
+class Table(list):
+    '''A list of the sizing rules, changing it in place counts as a change of the rules.'''
+    def _changed(method):
+        def changing(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            rules_changed()
+            return result
+        return changing
+
+    __setitem__ = _changed(list.__setitem__)
+    __delitem__ = _changed(list.__delitem__)
+    __iadd__ = _changed(list.__iadd__)
+    append = _changed(list.append)
+    extend = _changed(list.extend)
+    insert = _changed(list.insert)
+    pop = _changed(list.pop)
+    remove = _changed(list.remove)
+    sort = _changed(list.sort)
+    del _changed
+
+class Item(Rules):
+    def __init__(self, space, weight):
+        self.space = space
+        self.weight = weight
+
+#every item and box of the catalog by name (wh, tb, small_box...)
+ITEMS = {}
+
+#every package an order can get, as (name, box), the box being the item that adds its weight to the
+#order.  The tables below give packages by their index in this list, and the package with no box is
+#the one for orders that need multiple packaging (MULTIPLE)
+PACKAGES = Table()
+MULTIPLE = None
+MULTIPLE_PACKAGING = None
+
+#key of every package of PACKAGES in the catalog ("small", "case_3"...)
+PACKAGE_KEYS = Table()
+
+#outside (length, width, height) in inches of the box of every package of PACKAGES, None for the
+#packages that have no box or no dimensions in the catalog
+PACKAGE_DIMENSIONS = Table()
+
+'''Packages for orders with no gift boxes or only one gift box.  The package is the first one
+whose space limit is at least the space of the order (orders with no space at all only have salts
+and go in an envelope), and orders over the last limit need multiple packaging.  Case 3s are no
+longer an option for multiple packaging.'''
+SPACE_LIMITS = Table()
+SPACE_PACKAGES = Table()
+
+'''Packages for orders with more than one gift box.  Rows are the vertical inches of the gift boxes
+(GIFT_BOX_INCHES), 8 being the smallest combination of gift boxes that has to be packed separately
+(2 12x4s) and 24 the biggest one that fits in a Case 3.  Columns are the space of the rest of the
+order: under 1.00 (GIFT_BOX_MIN_SPACE) there are no other pretzels (smallest pretzel order is two
+bites/turnbuckles), and then up to each of GIFT_BOX_SPACE_LIMITS, which is the space of another
+12x4, 12x6, 12x8, 12x10 or 12x12 in the order, and more than that (which never fits).  The rows are
+tables too, so that changing a single package of the table counts as a change of the rules.'''
+GIFT_BOX_INCHES = Table()
+GIFT_BOX_MIN_SPACE = None
+GIFT_BOX_SPACE_LIMITS = Table()
+GIFT_BOX_TABLE = Table()
+
+'''The gift boxes of an order are counted by size (vertical inches of a 12x4, 12x6 and 12x8), so the
+engine knows exactly how many gift boxes there are and not only the inches they add up to.  The
+counts are kept in a single whole number (STACK_BITS bits for each size, see Compiled.stack_unit()),
+so they add up like the rest of the totals of an order.'''
+GIFT_BOX_SIZES = Table()
+STACK_BITS = 16
+
+class Product(Rules):
+    '''A product is anything a button of the calculator adds to an order.  space and weight are
+    those of the whole product (packaging of pretzel packs included), gift boxes add to
+    gift_box_space instead of space so that the space can be substracted in case of there being
+    more than one gift box, gift_box_code is the vertical inches of the gift box (4 for a 12x4,
+    6 for a 12x6 and 8 for a 12x8) and gbweight is the weight of the gift box's own box.'''
+    def __init__(self, name, space, gift_box_space, weight, gift_box_code = 0, gbweight = 0):
+        self.name = name
+        self.space = space
+        self.gift_box_space = gift_box_space
+        self.weight = weight
+        self.gift_box_code = gift_box_code
+        self.gbweight = gbweight
+
+class Pack(Product):
+    '''A product made of count items (a 12 Wheelhouse is 12 wh), its space and weight are always
+    those of the item times count, plus the weight of the packaging of the pack.'''
+    def __init__(self, name, item, count, packaging = 0):
+        self.name = name
+        self.gift_box_space = 0
+        self.gift_box_code = 0
+        self.gbweight = 0
+        self.item = item
+        self.count = count
+        self.packaging = packaging
+
+    @property
+    def space(self):
+        return self.item.space * self.count
+
+    @property
+    def weight(self):
+        return self.item.weight * self.count + self.packaging
+
+#every button of the calculator by SKU, the SKU being the name of the button in the window
+CATALOG = {}
+
+#SKU of every code a barcode scanner can read: the SKUs themselves and the "codes" (UPCs) of the
+#products, lower case (see find_sku())
+CODES = {}
+
+#the panels of buttons of the window, rows of {"title", "buttons": [[SKU, text]]...} (see catalog.py).
+#The engine doesn't use them, they are kept with the catalog so the window is built from it
+PANELS = []
+
+def numbers(values, what):
+    '''The values, raises ValueError if any of them is not a number.'''
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("%s have to be numbers, %r is not one" % (what, value))
+    return values
+
+def ascending(values, what):
+    '''The values, raises ValueError if they are not numbers from the smallest to the biggest.'''
+    numbers(values, what)
+    if any(value >= following for value, following in zip(values, values[1:])):
+        raise ValueError("%s have to go from the smallest to the biggest" % what)
+    return values
+
+def load_catalog(data):
+    '''Replaces the sizing rules in use with the ones of catalog data (see catalog.py).  Everything
+    is built and compiled (see Compiled) before anything is replaced, so catalog data with a
+    mistake raises ValueError and leaves the rules as they were.'''
+    global MULTIPLE, MULTIPLE_PACKAGING, GIFT_BOX_MIN_SPACE, _compiled
+    try:
+        items = {name: Item(*numbers([space, weight], "space and weight of %s" % name))
+                 for name, (space, weight) in data["items"].items()}
+        index = {key: position for position, (key, name, box) in enumerate(data["packages"])}
+        packages = [(name, items[box] if box is not None else None) for key, name, box in data["packages"]]
+        multiple = [position for position, (name, box) in enumerate(packages) if box is None]
+        if len(multiple) != 1:
+            raise ValueError("there has to be one package with no box (multiple packaging)")
+        dimensions = data.get("dimensions", {})
+        for box, sides in dimensions.items():
+            if box not in items or len(numbers(sides, "dimensions of %s" % box)) != 3 or min(sides) <= 0:
+                raise ValueError("dimensions of %s have to be the length, width and height of a box item" % box)
+        package_dimensions = [tuple(dimensions[box]) if box in dimensions else None for key, name, box in data["packages"]]
+        space_packages = [index[key] for key in data["space_packages"]]
+        if len(space_packages) != len(ascending(data["space_limits"], "space_limits")) + 1:
+            raise ValueError("space_packages needs a package for every space limit and one for more")
+        gift_box_table = [Table(index[key] for key in row) for row in data["gift_box_table"]]
+        if (len(gift_box_table) != len(ascending(data["gift_box_inches"], "gift_box_inches")) or
+            any(len(row) != len(ascending(data["gift_box_space_limits"], "gift_box_space_limits")) + 2 for row in gift_box_table)):
+            raise ValueError("gift_box_table needs a row for every gift_box_inches and a column for every space limit and two more")
+        numbers([data["gift_box_min_space"]], "gift_box_min_space")
+        numbers(data["gift_box_sizes"], "gift_box_sizes")
+        products = {}
+        for sku, product in data["products"].items():
+            if "item" in product:
+                count, packaging = numbers([product["count"], product.get("packaging", 0)], "count and packaging of %s" % sku)
+                products[sku] = Pack(product["name"], items[product["item"]], count, packaging)
+            else:
+                values = numbers([product.get("space", 0), product.get("gift_box_space", 0), product["weight"],
+                                  product.get("gift_box_code", 0), product.get("gbweight", 0)], "values of %s" % sku)
+                products[sku] = Product(product["name"], *values)
+                if product.get("gift_box_code", 0) and product["gift_box_code"] not in data["gift_box_sizes"]:
+                    raise ValueError("%s is a gift box of %s inches, which is not one of gift_box_sizes" % (sku, product["gift_box_code"]))
+        codes = {}
+        for sku, product in data["products"].items():
+            for code in [sku] + product.get("codes", []):
+                code = str(code).strip().lower()
+                if codes.setdefault(code, sku) != sku:
+                    raise ValueError("%s is the code of %s and of %s" % (code, codes[code], sku))
+        panels = data.get("panels", [])
+        for row in panels:
+            for panel in row:
+                for sku, text in panel["buttons"]:
+                    if sku not in products:
+                        raise ValueError("the %s button of %s is not a product" % (sku, panel["title"]))
+        rules = {"CATALOG": products, "PACKAGES": packages, "SPACE_LIMITS": data["space_limits"],
+                 "GIFT_BOX_INCHES": data["gift_box_inches"], "GIFT_BOX_MIN_SPACE": data["gift_box_min_space"],
+                 "GIFT_BOX_SPACE_LIMITS": data["gift_box_space_limits"], "GIFT_BOX_SIZES": data["gift_box_sizes"]}
+        new = Compiled(rules)
+    except (KeyError, TypeError, IndexError) as error:
+        raise ValueError("catalog is missing or has a wrong %s" % error)
+
+    ITEMS.clear()
+    ITEMS.update(items)
+    PACKAGES[:] = packages
+    MULTIPLE, MULTIPLE_PACKAGING = multiple[0], packages[multiple[0]][0]
+    PACKAGE_KEYS[:] = [key for key, name, box in data["packages"]]
+    PACKAGE_DIMENSIONS[:] = package_dimensions
+    SPACE_LIMITS[:] = data["space_limits"]
+    SPACE_PACKAGES[:] = space_packages
+    GIFT_BOX_INCHES[:] = data["gift_box_inches"]
+    GIFT_BOX_MIN_SPACE = data["gift_box_min_space"]
+    GIFT_BOX_SPACE_LIMITS[:] = data["gift_box_space_limits"]
+    GIFT_BOX_TABLE[:] = gift_box_table
+    GIFT_BOX_SIZES[:] = data["gift_box_sizes"]
+    CATALOG.clear()
+    CATALOG.update(products)
+    CODES.clear()
+    CODES.update(codes)
+    PANELS[:] = panels
+    rules_changed()
+    new.generation = generation
+    _compiled = new
+
+catalog_file = catalog.CATALOG_FILE #catalog file the rules were loaded from, and its stamp
+catalog_stamp = None
+
+def use_catalog(path = catalog.CATALOG_FILE):
+    '''Loads the sizing rules from a catalog file.'''
+    global catalog_file, catalog_stamp
+    file_stamp, data = catalog.read(path)
+    load_catalog(data)
+    catalog_file, catalog_stamp = path, file_stamp
+
+def reload_catalog():
+    '''Loads the catalog file again if it changed since it was loaded, returns True if it did.  The
+    window, the batch runner and the service call it between orders, so an order is never sized with
+    part of the old rules and part of the new ones.  A catalog file that can't be loaded (like one
+    that is still being saved) raises ValueError and the old rules stay in use until it can.'''
+    try:
+        file_stamp = catalog.stamp(catalog_file)
+    except OSError:
+        return False
+    if file_stamp == catalog_stamp:
+        return False
+    use_catalog(catalog_file)
+    return True
+
+
+def find_sku(code):
+    '''SKU of a scanned code (a SKU or a UPC of the catalog), None if it isn't one.  A single dict
+    lookup, so scans are resolved as fast as the scanner types them.'''
+    return CODES.get(code.strip().lower())
+
+class SizingResult():
+    '''What the calculator displays for an order: the package size and the package weight, given
+    in tenths of oz. (tenths), in oz. (weight) and as "x lb., y oz." (lb and oz).'''
+    def __init__(self, package, tenths):
+        self.package = package
+        self.tenths = tenths
+        self.weight = tenths / WEIGHT_UNITS
+        #the oz. have no decimals when reported, tenths of oz. are dropped
+        self.lb, self.oz = divmod(tenths // WEIGHT_UNITS, 16)
+
+    @property
+    def multiple(self):
+        return self.package == MULTIPLE_PACKAGING
+
+    def __repr__(self):
+        return "SizingResult(%r, %s lb., %s oz.)" % (self.package, self.lb, self.oz)
+
+class Compiled():
+    '''The sizing rules in whole units: the space, gift box space, gift box inches, weight,
+    gift box box weight and gift box count (stack_unit()) of every product (products), the tables of
+    space limits and inches, the weight every package adds (box_weights), and the row of
+    GIFT_BOX_TABLE of every combination of gift boxes that fits in a Case 3 (stacks).  compiled()
+    makes them again when the rules change.  rules are the tables by their names in this module
+    (CATALOG, PACKAGES, SPACE_LIMITS...), the ones in use by default, so load_catalog() can compile
+    new rules before they are put in use.'''
+    def __init__(self, rules = None):
+        rules = globals() if rules is None else rules
+        self.generation = generation
+        self.gift_box_sizes = [int(round(inches)) for inches in rules["GIFT_BOX_SIZES"]]
+        self.products = {sku: (space_units(product.space), space_units(product.gift_box_space),
+                               int(round(product.gift_box_code)), weight_units(product.weight),
+                               weight_units(product.gbweight), self.stack_unit(sku, product.gift_box_code))
+                         for sku, product in rules["CATALOG"].items()}
+        self.space_limits = [space_units(limit) for limit in rules["SPACE_LIMITS"]]
+        self.gift_box_inches = [int(round(inches)) for inches in rules["GIFT_BOX_INCHES"]]
+        self.gift_box_min_space = space_units(rules["GIFT_BOX_MIN_SPACE"])
+        self.gift_box_space_limits = [space_units(limit) for limit in rules["GIFT_BOX_SPACE_LIMITS"]]
+        self.box_weights = [weight_units(box.weight) if box is not None else 0 for name, box in rules["PACKAGES"]]
+        self.stacks = self.stack_rows()
+
+    def stack_unit(self, sku, gift_box_code):
+        '''What one product adds to the gift box count: 1 in the bits of its size, 0 if it is not a
+        gift box.'''
+        if not gift_box_code:
+            return 0
+        inches = int(round(gift_box_code))
+        if inches not in self.gift_box_sizes:
+            raise ValueError("%s is a gift box of %s inches, which is not one of GIFT_BOX_SIZES" % (sku, gift_box_code))
+        return 1 << (STACK_BITS * self.gift_box_sizes.index(inches))
+
+    def stack_rows(self):
+        '''{gift box count: row of GIFT_BOX_TABLE} for every combination of gift boxes up to the
+        inches of the last row, None for no gift boxes or only one (which go by space alone).'''
+        stacks = {0: None}
+        found = [(0, 0, 0)] #(gift box count, number of gift boxes, inches)
+        while found:
+            new = []
+            for stack, boxes, inches in found:
+                for index, size in enumerate(self.gift_box_sizes):
+                    bigger = stack + (1 << (STACK_BITS * index))
+                    if inches + size <= self.gift_box_inches[-1] and bigger not in stacks:
+                        stacks[bigger] = bisect_left(self.gift_box_inches, inches + size) if boxes else None
+                        new.append((bigger, boxes + 1, inches + size))
+            found = new
+        return stacks
+
+_compiled = None
+
+def compiled():
+    global _compiled
+    if _compiled is None or _compiled.generation != generation:
+        _compiled = Compiled()
+    return _compiled
+
+use_catalog()
+
+def is_quantity(quantity):
+    '''True for the quantities an order can have of a SKU: whole numbers over 0.'''
+    return isinstance(quantity, Integral) and not isinstance(quantity, bool) and quantity > 0
+
+def check_quantity(sku, quantity):
+    '''The quantity of a SKU of an order, raises ValueError if it is not a whole number over 0.'''
+    if not is_quantity(quantity):
+        raise ValueError("quantity of %s has to be a whole number over 0, not %r" % (sku, quantity))
+    return quantity
+
+def skus_of(order):
+    '''Yields the SKU of every item in the order, once per unit.  The order can be a dict of
+    SKU -> quantity or any iterable of SKUs (one per button click).  Quantities that are not whole
+    numbers over 0 raise ValueError (see check_quantity()).'''
+    if hasattr(order, "items"):
+        for sku, quantity in order.items():
+            for _ in range(check_quantity(sku, quantity)):
+                yield sku
+    else:
+        yield from order
+
+def quantities_of(order):
+    '''Yields (SKU, quantity) for every product in the order, the same SKU more than once if it
+    was clicked more than once (see skus_of()).'''
+    if hasattr(order, "items"):
+        for sku, quantity in order.items():
+            yield sku, check_quantity(sku, quantity)
+    else:
+        for sku in order:
+            yield sku, 1
+
+class OrderState():
+    '''Running totals of an order, updated as items are added: total_space (space of every item,
+    gift boxes included), gb_space (space taken by gift boxes), gift_box_counter (vertical inches of
+    gift boxes), weight, gb_box_weight (weight of the boxes of the gift boxes) and gift_boxes (how
+    many gift boxes of each size, see GIFT_BOX_SIZES).  Space is in thousandths and weight in tenths
+    of oz.  counts keeps the units of every SKU in the order, so only items that are in it can be
+    removed.'''
+    __slots__ = ("total_space", "gb_space", "gift_box_counter", "weight", "gb_box_weight", "gift_boxes", "counts")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.total_space = self.gb_space = self.gift_box_counter = self.weight = self.gb_box_weight = 0
+        self.gift_boxes = 0
+        self.counts = {}
+
+    def add(self, sku):
+        self.extend((sku,))
+
+    def remove(self, sku):
+        '''Takes an item that was added to the order back out of it, by taking its space and weight
+        off the totals, without adding up the rest of the order again.  Raises ValueError if the
+        order has no units of the SKU.'''
+        count = self.counts.get(sku, 0)
+        if not count:
+            raise ValueError("%s can't be removed, the order has none" % sku)
+        space, gift_box_space, gift_box_code, weight, gbweight, stack = compiled().products[sku]
+        self.total_space -= space + gift_box_space
+        self.gb_space -= gift_box_space
+        self.gift_box_counter -= gift_box_code
+        self.weight -= weight
+        self.gb_box_weight -= gbweight
+        self.gift_boxes -= stack
+        if count == 1:
+            del self.counts[sku]
+        else:
+            self.counts[sku] = count - 1
+
+    def extend(self, order):
+        '''Adds every item of the order (see skus_of()).  The values of a product are multiplied by
+        its quantity, so an order costs the same however many units of each product it has.'''
+        products = compiled().products
+        total_space, gb_space, gift_box_counter = self.total_space, self.gb_space, self.gift_box_counter
+        weight, gb_box_weight, gift_boxes, counts = self.weight, self.gb_box_weight, self.gift_boxes, self.counts
+        for sku, quantity in quantities_of(order):
+            space, gift_box_space, gift_box_code, product_weight, gbweight, stack = products[sku]
+            total_space += (space + gift_box_space) * quantity
+            gb_space += gift_box_space * quantity
+            gift_box_counter += gift_box_code * quantity
+            weight += product_weight * quantity
+            gb_box_weight += gbweight * quantity
+            gift_boxes += stack * quantity
+            counts[sku] = counts.get(sku, 0) + quantity
+        self.total_space, self.gb_space, self.gift_box_counter = total_space, gb_space, gift_box_counter
+        self.weight, self.gb_box_weight, self.gift_boxes = weight, gb_box_weight, gift_boxes
+        return self
+
+    def totals(self):
+        '''total_space, gb_space, gift_box_counter, weight, gb_box_weight and gift_boxes of the
+        order, as a tuple of whole numbers.'''
+        return self.total_space, self.gb_space, self.gift_box_counter, self.weight, self.gb_box_weight, self.gift_boxes
+
+    def result(self):
+        package, box_weight = select_package(self.total_space, self.gb_space, self.gift_box_counter,
+                                             self.gb_box_weight, self.gift_boxes)
+        return SizingResult(package, self.weight + box_weight)
+
+def accumulate(order):
+    '''Totals of a whole order (see OrderState.totals()).'''
+    return OrderState().extend(order).totals()
+
+def select_package(total_space, gb_space, gift_box_counter, gb_box_weight, gift_boxes):
+    '''Returns the package for the order and the weight (tenths of oz.) the package adds to the
+    order, from the totals of OrderState.
+
+    When there are no gift boxes, or only one gift box, the package size depends only on the
+    space of all the items (SPACE_LIMITS).  When there is more than one gift box the gift boxes
+    are stacked together in a bigger box, so the package size depends on the vertical inches of the
+    stack and on the space of the items that are not gift boxes (GIFT_BOX_TABLE), and the weight of
+    the boxes of every gift box in the stack is added too.  Whether there is more than one gift box,
+    and the row of the stack, are looked up by the gift boxes of the order (gift_boxes) in the rows
+    compiled for every combination of gift boxes that fits in a Case 3.'''
+    row = stack_row(gift_box_counter, gift_boxes)
+    if row is None:
+        return package_weight(space_package(total_space), 0)
+    #takes off the space the ITEMS inside the gift boxes take from the space counter, so only the
+    #space of the non-gift boxes along with the gift boxes is left to see what box size is needed
+    return package_weight(stack_package(total_space - gb_space, row), gb_box_weight)
+
+def stack_row(gift_box_counter, gift_boxes):
+    '''Row of GIFT_BOX_TABLE for the gift boxes of an order, None if it has no gift boxes or only
+    one, and len(GIFT_BOX_TABLE) if they don't fit in a Case 3.'''
+    rules = compiled()
+    if gift_box_counter > rules.gift_box_inches[-1]:
+        return len(rules.gift_box_inches)
+    return rules.stacks[gift_boxes]
+
+def more_than_one_gift_box(gift_box_counter, gift_boxes):
+    return stack_row(gift_box_counter, gift_boxes) is not None
+
+def package_weight(package, gb_box_weight):
+    '''Name of the package (index of PACKAGES) and the weight it adds to the order, gb_box_weight
+    being the weight of the boxes of the gift boxes packed inside it.'''
+    name, box = PACKAGES[package]
+    if box is None:
+        return name, 0
+    return name, compiled().box_weights[package] + gb_box_weight
+
+def space_package(space):
+    '''Package (index of PACKAGES) for no gift boxes, or one gift box, and space thousandths.'''
+    return SPACE_PACKAGES[bisect_left(compiled().space_limits, space)]
+
+def gift_box_package(space, gift_box_counter):
+    '''Package (index of PACKAGES) for more than one gift box, gift_box_counter being the vertical
+    inches of the gift boxes and space the thousandths of space of the rest of the order.'''
+    return stack_package(space, bisect_left(compiled().gift_box_inches, gift_box_counter))
+
+def stack_package(space, row):
+    '''Package (index of PACKAGES) for more than one gift box, row being the row of GIFT_BOX_TABLE
+    of the gift boxes (see stack_row()) and space the thousandths of space of the rest of the order.'''
+    rules = compiled()
+    if row == len(rules.gift_box_inches):
+        #gift box combinations that don't fit in a Case 3
+        return MULTIPLE
+    if space < rules.gift_box_min_space:
+        return GIFT_BOX_TABLE[row][0]
+    return GIFT_BOX_TABLE[row][bisect_left(rules.gift_box_space_limits, space) + 1]
+
+def package_cell(total_space, gb_space, gift_box_counter, gift_boxes):
+    '''Where the package of an order is in the package tables, from the totals of OrderState: (None,
+    position in SPACE_PACKAGES) for no gift boxes or only one, and (row, column) of GIFT_BOX_TABLE
+    for more than one (row len(GIFT_BOX_TABLE) if they don't fit in a Case 3).'''
+    rules = compiled()
+    row = stack_row(gift_box_counter, gift_boxes)
+    if row is None:
+        return None, bisect_left(rules.space_limits, total_space)
+    space = total_space - gb_space
+    if space < rules.gift_box_min_space:
+        return row, 0
+    return row, bisect_left(rules.gift_box_space_limits, space) + 1
+
+def size_order(order):
+    '''Returns the SizingResult of an order, given as a dict of SKU -> quantity or a list of
+    SKUs.  Raises KeyError for SKUs that are not in CATALOG.'''
+    return OrderState().extend(order).result()
@@ -0,0 +1,154 @@
+'''Opt-in timing of the sizing path, to see where the time goes when a packing station feels slow.
+
+Every stage that is timed (adding items to an order, choosing its package, and whatever the window
+registers with instrument(): button callbacks, setting the Tk variables, updating the list of items)
+gets a histogram of how long each call took, and the outcomes of choosing packages are counted
+(one box, more than one gift box stacked, multiple packaging).  Nothing is timed until enable() is
+called, and timing isn't just switched off by a flag: the timed wrappers are only put in place of
+the functions while it is enabled, so there is no cost at all when it is not.
+
+    instrument.enable()        (or ESPCO_INSTRUMENT=1 in the environment)
+    ...size some orders...
+    print(instrument.report())
+    instrument.dump("profile.json")
+
+python -m espco.batch --profile profile.json times a whole run, and the window shows the stats
+with F12 (F11 turns timing on and off).'''
+
+import json
+import os
+import time
+
+from . import engine
+
+enabled = False
+BUCKETS = 40 #bucket n of a histogram counts calls that took less than 2**n ns (2**40 ns is 18 min.)
+
+class Histogram():
+    '''Count, total, max and power of 2 buckets of the ns the calls of a stage took.'''
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = self.total = self.max = 0
+        self.buckets = [0] * BUCKETS
+
+    def record(self, ns):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        self.buckets[min(ns.bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        '''Upper bound (ns) of the bucket the fraction of calls falls in.'''
+        wanted = self.count * fraction
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted and count:
+                return min(2 ** bucket, self.max)
+        return self.max
+
+    def stats(self):
+        return {"count": self.count, "total_ms": self.total / 1e6,
+                "mean_us": self.total / self.count / 1000 if self.count else 0,
+                "p50_us": self.percentile(.5) / 1000, "p99_us": self.percentile(.99) / 1000, "max_us": self.max / 1000,
+                "buckets": {"<%d ns" % 2 ** bucket: count for bucket, count in enumerate(self.buckets) if count}}
+
+STAGES = {} #stage name -> Histogram
+COUNTS = {} #outcome -> how many times
+
+def reset():
+    #the timed functions keep their histograms, so they are emptied instead of replaced
+    for histogram in STAGES.values():
+        histogram.__init__()
+    COUNTS.clear()
+
+'''Targets are (namespace, name, stage, outcome) of every function that is timed when enabled: the
+namespace is a module, class or dict of globals the function is looked up in, and outcome (if
+given) says which outcome to count from the arguments and the return value.'''
+TARGETS = []
+_originals = {} #(id of namespace, name) -> function that was replaced by the timed one
+
+def _get(namespace, name):
+    return namespace[name] if isinstance(namespace, dict) else getattr(namespace, name)
+
+def _set(namespace, name, value):
+    if isinstance(namespace, dict):
+        namespace[name] = value
+    else:
+        setattr(namespace, name, value)
+
+def timed(function, stage, outcome = None):
+    '''function, recording how long every call takes in the histogram of stage.'''
+    histogram = STAGES.setdefault(stage, Histogram())
+    clock = time.perf_counter_ns
+    def timed_function(*args):
+        start = clock()
+        result = function(*args)
+        histogram.record(clock() - start)
+        if outcome is not None:
+            counted = outcome(args, result)
+            COUNTS[counted] = COUNTS.get(counted, 0) + 1
+        return result
+    timed_function.__wrapped__ = function
+    return timed_function
+
+def instrument(namespace, name, stage, outcome = None):
+    '''Times every call of namespace.name (or namespace[name]) as stage while timing is enabled.'''
+    TARGETS.append((namespace, name, stage, outcome))
+    if enabled:
+        _wrap(namespace, name, stage, outcome)
+
+def _wrap(namespace, name, stage, outcome):
+    function = _get(namespace, name)
+    _originals[id(namespace), name] = (namespace, function)
+    _set(namespace, name, timed(function, stage, outcome))
+
+def enable():
+    global enabled
+    if not enabled:
+        enabled = True
+        for target in TARGETS:
+            _wrap(*target)
+
+def disable():
+    global enabled
+    if enabled:
+        enabled = False
+        for (key, name), (namespace, function) in _originals.items():
+            _set(namespace, name, function)
+        _originals.clear()
+
+def package_outcome(args, result):
+    '''Outcome of engine.select_package(): which way the package was chosen.'''
+    if result[0] == engine.MULTIPLE_PACKAGING:
+        return "multiple packaging"
+    total_space, gb_space, gift_box_counter, gb_box_weight, gift_boxes = args
+    if engine.more_than_one_gift_box(gift_box_counter, gift_boxes):
+        return "gift box stack"
+    return "one box"
+
+instrument(engine.OrderState, "extend", "engine: add items")
+instrument(engine.OrderState, "result", "engine: result")
+instrument(engine, "select_package", "engine: choose package", package_outcome)
+
+def snapshot():
+    return {"stages": {stage: histogram.stats() for stage, histogram in STAGES.items() if histogram.count},
+            "counts": dict(COUNTS)}
+
+def report():
+    '''The stats as text, one line per stage and per outcome.'''
+    lines = ["%-28s %9s %10s %10s %10s" % ("stage", "calls", "mean us", "p99 us", "max us")]
+    for stage, stats in snapshot()["stages"].items():
+        lines.append("%-28s %9d %10.1f %10.1f %10.1f" % (stage, stats["count"], stats["mean_us"], stats["p99_us"], stats["max_us"]))
+    for counted, count in sorted(COUNTS.items()):
+        lines.append("%-28s %9d" % (counted, count))
+    return "\n".join(lines)
+
+def dump(path):
+    with open(path, "w") as out:
+        json.dump(snapshot(), out, indent = 2)
+
+if os.environ.get("ESPCO_INSTRUMENT"):
+    enable()
@@ -0,0 +1,165 @@
+'''Boxes on hand, so orders are sized with the boxes there are.
+
+The package tables of the engine give the smallest box an order fits in, as if every box was always
+in stock.  An Inventory keeps count of the boxes on hand (by the package keys of the catalog:
+"small", "twelve_by_10", "case_3"...) and when the box of an order has run out it falls back to the
+smallest box in stock the order also fits in:
+
+    - for orders with no gift boxes or only one, any package of a bigger space limit
+    - for orders with more than one gift box, any package of GIFT_BOX_TABLE for as many inches or
+      more and as much space or more
+
+and to multiple packaging when none of those are left.  Packages are smaller the earlier they are
+in the packages of the catalog.  Boxes that are not given a count are never short.
+
+    boxes = Inventory({"twelve_by_10": 0, "case_3": 40})
+    result = boxes.size_order({"wh_24": 2})       #takes a box off the count
+    boxes.on_hand, boxes.used, boxes.fallbacks
+
+Before a shift the whole backlog of orders can be planned with the boxes on hand, which gives the
+box to pick for every order (with its items) and how many of each box the backlog will use:
+
+    python -m espco.inventory backlog.csv --on-hand small=300 twelve_by_10=0 case_3=40 -o picks.csv
+
+(--on-hand can also be a JSON file of {package key: count}).'''
+
+import argparse
+import json
+import sys
+import time
+
+from . import batch, engine
+
+class Inventory():
+    '''Boxes on hand by package key, and the boxes used and the fallbacks made since it was made.'''
+    def __init__(self, on_hand = None):
+        self.on_hand = dict(on_hand or {})
+        for key in self.on_hand:
+            if key not in engine.PACKAGE_KEYS:
+                raise ValueError("%s is not a package of the catalog" % key)
+        self.used = {} #package key -> boxes used
+        self.fallbacks = {} #(package key wanted, package key used) -> how many times
+        self.generation = None
+
+    def candidates(self, cell):
+        '''Packages an order in cell of the package tables (see engine.package_cell()) fits in, its
+        own package first and then the others from the smallest, MULTIPLE last.  Worked out once
+        for every cell of the tables, again when the rules change.'''
+        if self.generation != engine.generation:
+            self.generation = engine.generation
+            self.cells = {}
+        if cell not in self.cells:
+            row, column = cell
+            if row is None:
+                fits = engine.SPACE_PACKAGES[column:]
+            elif row < len(engine.GIFT_BOX_TABLE):
+                fits = [package for table_row in engine.GIFT_BOX_TABLE[row:] for package in table_row[column:]]
+            else:
+                fits = [engine.MULTIPLE]
+            others = sorted(set(fits) - {fits[0], engine.MULTIPLE})
+            self.cells[cell] = [fits[0]] + others + ([engine.MULTIPLE] if fits[0] != engine.MULTIPLE else [])
+        return self.cells[cell]
+
+    def in_stock(self, package):
+        return package == engine.MULTIPLE or self.on_hand.get(engine.PACKAGE_KEYS[package], 1) > 0
+
+    def choose(self, total_space, gb_space, gift_box_counter, gift_boxes):
+        '''(package the tables give, package in stock) for the totals of an order (indexes of
+        engine.PACKAGES).  Nothing is taken off the count.'''
+        candidates = self.candidates(engine.package_cell(total_space, gb_space, gift_box_counter, gift_boxes))
+        for package in candidates:
+            if self.in_stock(package):
+                return candidates[0], package
+
+    def take(self, package, wanted = None):
+        '''Takes a box of the package off the count, wanted being the package the tables gave.'''
+        key = engine.PACKAGE_KEYS[package]
+        if package != engine.MULTIPLE:
+            if key in self.on_hand:
+                self.on_hand[key] -= 1
+            self.used[key] = self.used.get(key, 0) + 1
+        if wanted is not None and wanted != package:
+            fallback = (engine.PACKAGE_KEYS[wanted], key)
+            self.fallbacks[fallback] = self.fallbacks.get(fallback, 0) + 1
+
+    def size(self, order):
+        '''Sizes an order in a box that is in stock and takes the box off the count.  Returns the
+        SizingResult and the package the tables gave (index of engine.PACKAGES).'''
+        total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = engine.accumulate(order)
+        wanted, package = self.choose(total_space, gb_space, gift_box_counter, gift_boxes)
+        self.take(package, wanted)
+        if not engine.more_than_one_gift_box(gift_box_counter, gift_boxes):
+            gb_box_weight = 0
+        name, box_weight = engine.package_weight(package, gb_box_weight)
+        return engine.SizingResult(name, weight + box_weight), wanted
+
+    def size_order(self, order):
+        '''Same as engine.size_order(), in a box that is in stock.'''
+        return self.size(order)[0]
+
+PICK_FIELDS = ["order_id", "package", "instead_of", "lb", "oz", "items", "error"]
+
+def plan(orders, boxes, writer):
+    '''Sizes every (order_id, items) order of a backlog with the boxes on hand, writing its line of
+    the pick list as it goes.  Returns how many orders were planned.'''
+    count = 0
+    for count, (order_id, items) in enumerate(orders, 1):
+        try:
+            result, wanted = boxes.size(items)
+        except KeyError as error:
+            writer.write({"order_id": order_id, "error": "unknown SKU %s" % error})
+            continue
+        except ValueError as error:
+            writer.write({"order_id": order_id, "error": str(error)})
+            continue
+        wanted = engine.PACKAGES[wanted][0]
+        writer.write({"order_id": order_id, "package": result.package, "instead_of": wanted if wanted != result.package else "",
+                      "lb": result.lb, "oz": result.oz, "items": "; ".join("%s x%d" % item for item in items.items()),
+                      "error": ""})
+    return count
+
+def parse_on_hand(values):
+    '''{package key: count} from key=count values, or from a JSON file.'''
+    if len(values) == 1 and "=" not in values[0]:
+        with open(values[0], encoding = "utf-8") as on_hand_file:
+            return json.load(on_hand_file)
+    on_hand = {}
+    for value in values:
+        key, count = value.split("=")
+        on_hand[key] = int(count)
+    return on_hand
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.inventory", description = "Plan the boxes of a backlog of orders.")
+    parser.add_argument("input", help = "CSV or JSONL file with the orders (see batch.py)")
+    parser.add_argument("-o", "--output", default = "-", help = "where the pick list is written, - for stdout (default)")
+    parser.add_argument("--input-format", choices = sorted(batch.READERS))
+    parser.add_argument("--on-hand", nargs = "+", default = [], metavar = "KEY=COUNT",
+                        help = "boxes on hand by package key, or a JSON file of them (boxes not given are never short)")
+    args = parser.parse_args(argv)
+
+    boxes = Inventory(parse_on_hand(args.on_hand))
+    on_hand = dict(boxes.on_hand)
+    start = time.perf_counter()
+    with open(args.input, newline = "") as source:
+        out = sys.stdout if args.output == "-" else open(args.output, "w", newline = "")
+        try:
+            orders = batch.READERS[batch.file_format(args.input, args.input_format)](source)
+            count = plan(orders, boxes, batch.CSVWriter(out, PICK_FIELDS))
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    elapsed = time.perf_counter() - start
+
+    print("%d orders planned in %.2f s" % (count, elapsed), file = sys.stderr)
+    print("%-16s %8s %8s %8s" % ("box", "used", "on hand", "left"), file = sys.stderr)
+    for key in engine.PACKAGE_KEYS:
+        if key in boxes.used or key in on_hand:
+            print("%-16s %8d %8s %8s" % (key, boxes.used.get(key, 0), on_hand.get(key, "-"), boxes.on_hand.get(key, "-")),
+                  file = sys.stderr)
+    for (wanted, used), times in sorted(boxes.fallbacks.items()):
+        print("%d orders for %s went in %s" % (times, wanted, used), file = sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
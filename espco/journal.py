@@ -0,0 +1,193 @@
+'''Journal of every order the calculator sized, so a weight can be checked when a carrier disputes it
+or a label reprinted without entering the order again.
+
+The journal is a directory with two files that are only ever appended to:
+
+    orders.jsonl   one compact JSON line per order: id, time, station, items, package, weight
+                   (tenths of oz., lb and oz.) and the totals of the order (OrderState.totals())
+    orders.idx     one fixed size record per order (INDEX): id, time, and where its line starts
+                   and ends in orders.jsonl
+
+Ids are given in order (1, 2, 3...) and times never go back, so the index is sorted by both: an
+order is found by id straight away (its record is at id - first id) and by time with a binary
+search.  Both files are memory-mapped to be read, so reports over months of orders only read the
+lines they need and never load the whole journal:
+
+    python -m espco.journal show 1234
+    python -m espco.journal list --from 2026-10-01 --to 2026-10-31
+    python -m espco.journal report --from 2026-10-01 --to 2026-10-31
+
+The calculator saves every order when ENTER NEW ORDER is clicked (to ESPCO_JOURNAL, espco_journal
+by default), and it is the only one that writes to the journal: the lookups above open it read only,
+so they never change the files while the calculator is saving an order.'''
+
+import argparse
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+
+INDEX = struct.Struct("<QdQQ") #id, time (seconds since the epoch), start and end of the line in orders.jsonl
+
+def station():
+    '''Name of the station the orders are sized at: ESPCO_STATION, or the name of the computer.'''
+    return os.environ.get("ESPCO_STATION") or socket.gethostname()
+
+class Journal():
+    '''The journal in directory.  Only the calculator writes to it, the others open it read_only:
+    the files are never changed, and a record that is still being written is not read.'''
+    def __init__(self, directory, read_only = False):
+        self.directory = directory
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(directory, exist_ok = True)
+        mode = "rb" if read_only else "a+b"
+        self.data = open(os.path.join(directory, "orders.jsonl"), mode)
+        self.index = open(os.path.join(directory, "orders.idx"), mode)
+        self.maps = {} #file -> (size, mmap) of the last read
+        if not read_only:
+            self.repair()
+
+    def repair(self):
+        '''An order is only journaled once its index record is written (after its line), so a line
+        or record cut short by a crash is taken off.'''
+        records = len(self)
+        self.index.truncate(records * INDEX.size)
+        order_id, when, start, end = self.record(records - 1) if records else (0, 0, 0, 0)
+        self.data.truncate(end)
+        self.last = (order_id, when) #id and time of the last order, for the next one
+
+    def __len__(self):
+        '''Orders journaled: whole records of the index (a record cut short is not counted).'''
+        return os.fstat(self.index.fileno()).st_size // INDEX.size
+
+    def close(self):
+        for size, mapped in self.maps.values():
+            mapped.close()
+        self.maps.clear()
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, items, result, totals = None, when = None, order_station = None):
+        '''Journals an order: items as a dict of SKU -> quantity, result its SizingResult.  Returns
+        the id of the order.'''
+        if self.read_only:
+            raise ValueError("%s is open read only" % self.directory)
+        last_id, last_time = self.last
+        order_id = last_id + 1
+        when = max(time.time() if when is None else when, last_time)
+        line = json.dumps({"id": order_id, "time": when, "station": order_station or station(), "items": items,
+                           "package": result.package, "tenths": result.tenths, "lb": result.lb, "oz": result.oz,
+                           "totals": list(totals) if totals else None}, separators = (",", ":")).encode() + b"\n"
+        self.data.seek(0, os.SEEK_END)
+        start = self.data.tell()
+        self.data.write(line)
+        self.data.flush()
+        self.index.write(INDEX.pack(order_id, when, start, start + len(line)))
+        self.index.flush()
+        self.last = (order_id, when)
+        return order_id
+
+    def mapped(self, journal_file):
+        '''mmap of the file, mapped again if the file grew since the last read.'''
+        size = os.fstat(journal_file.fileno()).st_size
+        if journal_file not in self.maps or self.maps[journal_file][0] != size:
+            if journal_file in self.maps:
+                self.maps[journal_file][1].close()
+            self.maps[journal_file] = (size, mmap.mmap(journal_file.fileno(), size, access = mmap.ACCESS_READ) if size else b"")
+        return self.maps[journal_file][1]
+
+    def record(self, position):
+        '''(id, time, start, end) of the index record at position.'''
+        return INDEX.unpack_from(self.mapped(self.index), position * INDEX.size)
+
+    def entry(self, position):
+        order_id, when, start, end = self.record(position)
+        return json.loads(self.mapped(self.data)[start:end])
+
+    def get(self, order_id):
+        '''The journaled order with the id, None if there isn't one.'''
+        count = len(self)
+        if not count:
+            return None
+        position = order_id - self.record(0)[0]
+        if not 0 <= position < count:
+            return None
+        return self.entry(position)
+
+    def position_at(self, when):
+        '''Position of the first order journaled at or after when (binary search of the index).'''
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[1] < when:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def between(self, start = None, end = None):
+        '''Yields the orders journaled from start up to (not including) end, times in seconds since
+        the epoch (None for the first or the last order).'''
+        first = 0 if start is None else self.position_at(start)
+        last = len(self) if end is None else self.position_at(end)
+        for position in range(first, last):
+            yield self.entry(position)
+
+def report(entries):
+    '''Orders, items and shipped weight (tenths of oz.) by package.'''
+    packages = {}
+    for entry in entries:
+        orders, items, tenths = packages.get(entry["package"], (0, 0, 0))
+        packages[entry["package"]] = (orders + 1, items + sum(entry["items"].values()), tenths + entry["tenths"])
+    return packages
+
+def parse_day(day):
+    return time.mktime(time.strptime(day, "%Y-%m-%d"))
+
+def describe(entry):
+    return "#%d %s %s: %s, %d lb. %d oz. (%s)" % (entry["id"], time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["time"])),
+                                                  entry["station"], entry["package"], entry["lb"], entry["oz"],
+                                                  ", ".join("%s x%d" % item for item in entry["items"].items()))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.journal", description = "Look orders up in the journal.")
+    parser.add_argument("command", choices = ["show", "list", "report"])
+    parser.add_argument("id", nargs = "?", type = int, help = "id of the order to show")
+    parser.add_argument("--journal", default = os.environ.get("ESPCO_JOURNAL", "espco_journal"))
+    parser.add_argument("--from", dest = "start", type = parse_day, help = "first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest = "end", type = parse_day, help = "last day (YYYY-MM-DD), included")
+    args = parser.parse_args(argv)
+    end = args.end + 24 * 60 * 60 if args.end is not None else None
+
+    try:
+        journal = Journal(args.journal, read_only = True)
+    except FileNotFoundError:
+        print("no journal in %s" % args.journal)
+        return 1
+    with journal:
+        if args.command == "show":
+            entry = journal.get(args.id) if args.id is not None else None
+            if entry is None:
+                print("no order %s in %s" % (args.id, args.journal))
+                return 1
+            print(describe(entry))
+        elif args.command == "list":
+            for entry in journal.between(args.start, end):
+                print(describe(entry))
+        else:
+            for package, (orders, items, tenths) in sorted(report(journal.between(args.start, end)).items()):
+                print("%-40s %7d orders %8d items %10.1f lb." % (package, orders, items, tenths / 10 / 16))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
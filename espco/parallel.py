@@ -0,0 +1,61 @@
+'''Sizes an order export across several processes, for backlogs too big for one (holiday season).
+
+The orders are split in chunks of chunk_size orders, every chunk is sized by one of the workers of a
+ProcessPoolExecutor, and the results are written in the same order the orders came in, so the
+output is the same as sizing them in one process (python -m espco.batch --workers 4 ...).  Only a
+few chunks per worker are read ahead, so the memory used still doesn't grow with the file.'''
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from . import batch
+
+_sizer = None #sizer of the worker process, set up by _start_worker()
+_split = False
+
+def _start_worker(cache_size, decision_table, split):
+    global _sizer, _split
+    _sizer, sizes = batch.make_sizer(cache_size, decision_table)
+    _split = split
+
+def _size_chunk(orders):
+    '''Runs in a worker: returns the result rows of a chunk of orders, the pid of the worker and how
+    long it took.'''
+    start = time.perf_counter()
+    rows = [batch.result_row(order_id, result, error, items if _split else None)
+            for order_id, items, result, error in batch.size_orders(orders, _sizer)]
+    return rows, os.getpid(), time.perf_counter() - start
+
+def chunks(orders, chunk_size):
+    orders = iter(orders)
+    while True:
+        chunk = list(islice(orders, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def run(orders, writer, workers, chunk_size = 2000, cache_size = 0, decision_table = None, split = False):
+    '''Sizes every order with workers processes and writes the results in order as they are ready.
+    Returns how many orders were sized and {pid: (orders, seconds busy)} for every worker.'''
+    count = 0
+    stats = {}
+    with ProcessPoolExecutor(workers, initializer = _start_worker, initargs = (cache_size, decision_table, split)) as executor:
+        pending = deque()
+        def write_first():
+            rows, pid, busy = pending.popleft().result()
+            for row in rows:
+                writer.write(row)
+            sized, seconds = stats.get(pid, (0, 0.0))
+            stats[pid] = (sized + len(rows), seconds + busy)
+            return len(rows)
+
+        for chunk in chunks(orders, chunk_size):
+            pending.append(executor.submit(_size_chunk, chunk))
+            if len(pending) >= workers * 2:
+                count += write_first()
+        while pending:
+            count += write_first()
+    return count, stats
@@ -0,0 +1,227 @@
+'''Precompiled decision table of every order that fits in one box.
+
+Orders over the last space limit (12.00, the limit of a Case 1) get the last package of the space
+packages, and orders with more than one gift box over the last limit of the gift box table the last
+package of their row (multiple packaging, in both cases with the catalog as it comes), so the
+package of every other order can be worked out ahead of time.  The package only depends on:
+
+    - for orders with no gift boxes or only one: the total space of the order
+    - for orders with more than one gift box: the inches of the gift boxes and the space of the
+      rest of the order
+
+so the table has a package (index of engine.PACKAGES) for every space in thousandths from 0 to
+the last space limit, and for every row of engine.GIFT_BOX_INCHES and space from 0 to the last column of
+engine.GIFT_BOX_TABLE.  Looking up an order is then a single probe of the table, which is saved as a
+flat file that is memory-mapped when loaded:
+
+    python -m espco.precompiled compile espco_decision_table.bin
+    python -m espco.precompiled verify espco_decision_table.bin
+
+compile enumerates every space that can be reached with the buttons of the calculator and reports
+how many there are, verify sizes a real order for every one of them with the live rules
+(engine.size_order()) and reports every order where the table and the live rules disagree.'''
+
+import argparse
+import hashlib
+import mmap
+import struct
+import sys
+
+from . import engine
+
+MAGIC = b"ESPCODT1"
+HEADER = struct.Struct("<8s20sIII") #magic, rules fingerprint, space entries, gift box rows, gift box columns
+
+def rules_fingerprint():
+    '''sha1 of everything the package of an order depends on, a table compiled with different rules
+    than the current ones can't be used.'''
+    rules = ([(name, box.weight if box else None) for name, box in engine.PACKAGES], list(engine.SPACE_LIMITS),
+             list(engine.SPACE_PACKAGES), list(engine.GIFT_BOX_SIZES), list(engine.GIFT_BOX_INCHES), engine.GIFT_BOX_MIN_SPACE,
+             list(engine.GIFT_BOX_SPACE_LIMITS), [list(row) for row in engine.GIFT_BOX_TABLE],
+             sorted((sku, product.space, product.gift_box_space, product.gift_box_code, product.gbweight)
+                    for sku, product in engine.CATALOG.items()))
+    return hashlib.sha1(repr(rules).encode()).digest()
+
+def space_limit():
+    return engine.space_units(engine.SPACE_LIMITS[-1])
+
+def gift_box_space_limit():
+    return engine.space_units(engine.GIFT_BOX_SPACE_LIMITS[-1])
+
+def compile_table():
+    '''Runs every space within the limits through the current rules, returns the table as bytes.'''
+    limit, gift_box_limit = space_limit(), gift_box_space_limit()
+    table = bytearray(HEADER.pack(MAGIC, rules_fingerprint(), limit + 1, len(engine.GIFT_BOX_INCHES), gift_box_limit + 1))
+    for space in range(limit + 1):
+        table.append(engine.space_package(space))
+    for inches in engine.compiled().gift_box_inches:
+        for space in range(gift_box_limit + 1):
+            table.append(engine.gift_box_package(space, inches))
+    return bytes(table)
+
+class DecisionTable():
+    '''A compiled table, loaded from a file (memory-mapped) or from bytes.'''
+    def __init__(self, data):
+        magic, self.fingerprint, self.spaces, self.rows, self.columns = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an ESPCO decision table")
+        self.data = data
+        self.gift_box_start = HEADER.size + self.spaces
+        self.generation = engine.generation
+        self.current = self.fingerprint == rules_fingerprint()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as table_file:
+            return cls(mmap.mmap(table_file.fileno(), 0, access = mmap.ACCESS_READ))
+
+    def is_current(self):
+        '''True if the table was compiled with the current sizing rules.'''
+        if self.generation != engine.generation:
+            self.generation = engine.generation
+            self.current = self.fingerprint == rules_fingerprint()
+        return self.current
+
+    def package(self, total_space, gb_space, gift_box_counter, gift_boxes):
+        '''Same as engine.select_package() but returns the index of the package in engine.PACKAGES.
+        Spaces over the last limit get the last package of their row, like the engine gives them
+        (multiple packaging with the catalog as it comes).'''
+        row = engine.stack_row(gift_box_counter, gift_boxes)
+        if row is None:
+            if total_space >= self.spaces:
+                return engine.SPACE_PACKAGES[-1]
+            return self.data[HEADER.size + total_space]
+        if row >= self.rows:
+            #gift box combinations that don't fit in a Case 3 (see engine.stack_package())
+            return engine.MULTIPLE
+        space = total_space - gb_space
+        if space >= self.columns:
+            return engine.GIFT_BOX_TABLE[row][-1]
+        return self.data[self.gift_box_start + row * self.columns + space]
+
+    def size_order(self, order):
+        '''Same as engine.size_order() with the package looked up in the table.  Falls back to the
+        live rules if the rules changed since the table was compiled.'''
+        if not self.is_current():
+            return engine.size_order(order)
+        total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = engine.accumulate(order)
+        package = self.package(total_space, gb_space, gift_box_counter, gift_boxes)
+        if not engine.more_than_one_gift_box(gift_box_counter, gift_boxes):
+            gb_box_weight = 0
+        name, box_weight = engine.package_weight(package, gb_box_weight)
+        return engine.SizingResult(name, weight + box_weight)
+
+def reachable_spaces(limit):
+    '''Every space (in thousandths) up to limit that the products that are not gift boxes can add
+    up to, with one order that adds up to it: {space: [SKUs]}.'''
+    products = [(engine.space_units(product.space), sku) for sku, product in engine.CATALOG.items()
+                if not product.gift_box_code and engine.space_units(product.space) > 0]
+    last = [None] * (limit + 1) #SKU added last to reach each space
+    reached = [False] * (limit + 1)
+    reached[0] = True
+    for space in range(limit + 1):
+        if not reached[space]:
+            continue
+        for product_space, sku in products:
+            if space + product_space <= limit and not reached[space + product_space]:
+                reached[space + product_space] = True
+                last[space + product_space] = sku
+    orders = {}
+    for space in range(limit + 1):
+        if reached[space]:
+            order = []
+            left = space
+            while left:
+                order.append(last[left])
+                left -= engine.space_units(engine.CATALOG[last[left]].space)
+            orders[space] = order
+    return orders
+
+def gift_box_stacks():
+    '''Combinations of more than one gift box: every pair of gift boxes, and a combination for every
+    other row of engine.GIFT_BOX_INCHES that can be reached.  Returns a list of lists of SKUs.'''
+    gift_boxes = [sku for sku, product in engine.CATALOG.items() if product.gift_box_code]
+    stacks = {}
+    for first, sku in enumerate(gift_boxes):
+        for other in gift_boxes[first:]:
+            stacks.setdefault(engine.CATALOG[sku].gift_box_code + engine.CATALOG[other].gift_box_code, []).append([sku, other])
+    #adding one gift box at a time to the combinations found so far, until nothing new is found
+    found = {inches: pairs[0] for inches, pairs in stacks.items()}
+    while found:
+        new = {}
+        for inches, stack in found.items():
+            for sku in gift_boxes:
+                total = inches + engine.CATALOG[sku].gift_box_code
+                if total <= engine.GIFT_BOX_INCHES[-1] and total not in stacks and total not in new:
+                    new[total] = stack + [sku]
+        for inches, stack in new.items():
+            stacks[inches] = [stack]
+        found = new
+    return [stack for inches in sorted(stacks) for stack in stacks[inches]]
+
+def near_limits(space):
+    '''True for spaces within 2 thousandths of a column of engine.GIFT_BOX_TABLE, where a mistake in
+    the units of the rules would put an order on the wrong side.'''
+    limits = [engine.space_units(engine.GIFT_BOX_MIN_SPACE)] + [engine.space_units(limit) for limit in engine.GIFT_BOX_SPACE_LIMITS]
+    return any(abs(space - limit) <= 2 for limit in limits)
+
+def reachable_orders():
+    '''Yields an order for every reachable state of the table: every space with no gift box and with
+    each gift box, and every space with the first combination of gift boxes of each height.  Every
+    other combination of gift boxes is only tried with the spaces near the limits of the table.'''
+    spaces = reachable_spaces(space_limit())
+    gift_boxes = [sku for sku, product in engine.CATALOG.items() if product.gift_box_code]
+    for space, order in spaces.items():
+        yield order
+        for sku in gift_boxes:
+            if space + engine.space_units(engine.CATALOG[sku].gift_box_space) <= space_limit():
+                yield order + [sku]
+    heights = set()
+    for stack in gift_box_stacks():
+        inches = sum(engine.CATALOG[sku].gift_box_code for sku in stack)
+        first = inches not in heights
+        heights.add(inches)
+        for space, order in spaces.items():
+            if space <= gift_box_space_limit() and (first or near_limits(space)):
+                yield stack + order
+
+def verify(table):
+    '''Sizes an order for every reachable state with the table and with the live rules, returns how
+    many orders were checked and the list of (order, table result, live result) that disagree.'''
+    checked = 0
+    disagreements = []
+    for order in reachable_orders():
+        total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = engine.accumulate(order)
+        package = engine.PACKAGES[table.package(total_space, gb_space, gift_box_counter, gift_boxes)][0]
+        live = engine.size_order(order)
+        if package != live.package:
+            disagreements.append((order, package, live.package))
+        checked += 1
+    return checked, disagreements
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.precompiled", description = "Compile or verify the decision table.")
+    parser.add_argument("command", choices = ["compile", "verify"])
+    parser.add_argument("path", nargs = "?", default = "espco_decision_table.bin")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        data = compile_table()
+        with open(args.path, "wb") as table_file:
+            table_file.write(data)
+        print("%s: %d bytes, %d reachable spaces" % (args.path, len(data), len(reachable_spaces(space_limit()))))
+        table = DecisionTable(data)
+    else:
+        table = DecisionTable.load(args.path)
+        if not table.is_current():
+            print("%s was compiled with different sizing rules, compile it again" % args.path)
+            return 1
+
+    checked, disagreements = verify(table)
+    for order, package, live in disagreements:
+        print("%s: table says %r, rules say %r" % (" + ".join(order), package, live))
+    print("%d orders checked, %d disagreements" % (checked, len(disagreements)))
+    return 1 if disagreements else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
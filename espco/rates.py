@@ -0,0 +1,111 @@
+'''Billable weight and shipping cost of the package chosen for an order.
+
+Carriers bill the greater of the actual weight of a package and its dimensional weight (length x
+width x height of the box in inches, divided by the carrier's divisor), both rounded up to the next
+whole lb.  The dimensions of the boxes are in the catalog (espco/catalog.json) and the rates of the
+carrier account in a rate table file, kept locally (rates.example.json has the format, with made up
+rates):
+
+    dim_divisor   cubic inches per lb of dimensional weight (139 for most carriers)
+    services      {service: {"zones": [zones], "rates": [[rate of each zone] for 1 lb, 2 lb...]}}
+
+    rates = RateTable.load("rates.json")
+    billable_lb, cents = rates.estimate(engine.size_order(order), "ground", 5)
+
+Like the engine, costs are in whole units (cents), and each service keeps a list of the cost of
+every billable lb for each zone, so costing an order is two list lookups.  With NumPy installed,
+the orders of a whole day are costed at once by vectorized.estimate_costs() from the same lists:
+
+    python -m espco.rates rates.json orders.csv --service ground'''
+
+import argparse
+import json
+import sys
+import time
+
+from . import engine
+
+CENTS = 100
+OZ_PER_LB = 16
+
+class RateTable():
+    '''The rates of a rate table file: for every service, the index of each zone and the cost in
+    cents of every billable lb in each zone (lists indexed by lb, index 0 is not used).'''
+    def __init__(self, data):
+        try:
+            self.dim_divisor = data["dim_divisor"]
+            self.services = {}
+            for service, table in data["services"].items():
+                if any(len(row) != len(table["zones"]) for row in table["rates"]):
+                    raise ValueError("every rate of %s needs a cost for each of its zones" % service)
+                zones = {zone: index for index, zone in enumerate(table["zones"])}
+                by_zone = [[None] + [int(round(row[index] * CENTS)) for row in table["rates"]] for index in range(len(zones))]
+                self.services[service] = (zones, by_zone)
+        except (KeyError, TypeError) as error:
+            raise ValueError("rate table is missing or has a wrong %s" % error)
+        self.generation = None
+        self.arrays = {} #service -> zones x lb array of the costs, made by vectorized.estimate_costs()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding = "utf-8") as rates_file:
+            return cls(json.load(rates_file))
+
+    def max_lb(self, service):
+        return len(self.services[service][1][0]) - 1
+
+    def packages(self):
+        '''(index of every package name of engine.PACKAGES, dimensional lb of every package), made
+        again when the catalog changes.  Packages with no dimensions have a dimensional weight of 0.'''
+        if self.generation != engine.generation:
+            self.generation = engine.generation
+            self.package_index = {name: index for index, (name, box) in enumerate(engine.PACKAGES)}
+            self.dim_lb = [int(-(-sides[0] * sides[1] * sides[2] // self.dim_divisor)) if sides else 0
+                           for sides in engine.PACKAGE_DIMENSIONS]
+        return self.package_index, self.dim_lb
+
+    def billable_lb(self, package, tenths):
+        '''Billable lb of a package (index of engine.PACKAGES) weighing tenths of oz.'''
+        actual = max(1, -(-tenths // (engine.WEIGHT_UNITS * OZ_PER_LB)))
+        return max(actual, self.packages()[1][package])
+
+    def estimate(self, result, service, zone):
+        '''(billable lb, cost in cents) of shipping a SizingResult with the service to the zone.  Both
+        are None for orders that need multiple packaging, and the cost is None over the heaviest
+        rate of the service.  Raises KeyError for a service or zone that is not in the table.'''
+        package = self.packages()[0][result.package]
+        if package == engine.MULTIPLE:
+            return None, None
+        zones, by_zone = self.services[service]
+        rates = by_zone[zones[zone]]
+        billable = self.billable_lb(package, result.tenths)
+        return billable, rates[billable] if billable < len(rates) else None
+
+def main(argv = None):
+    from . import batch, vectorized #needs NumPy
+    parser = argparse.ArgumentParser(prog = "python -m espco.rates", description = "Shipping cost of every order of an order export.")
+    parser.add_argument("rates", help = "rate table file (see rates.example.json)")
+    parser.add_argument("input", help = "CSV or JSONL file with the orders (see batch.py)")
+    parser.add_argument("--input-format", choices = sorted(batch.READERS))
+    parser.add_argument("--service", required = True)
+    args = parser.parse_args(argv)
+
+    rates = RateTable.load(args.rates)
+    with open(args.input, newline = "") as source:
+        orders, errors = vectorized.check_orders(batch.READERS[batch.file_format(args.input, args.input_format)](source))
+    for order_id, error in errors:
+        print("order %s skipped: %s" % (order_id, error), file = sys.stderr)
+    start = time.perf_counter()
+    packages, tenths = vectorized.size_matrix(vectorized.count_matrix(orders))
+    costs = vectorized.estimate_costs(packages, tenths, rates, args.service)
+    elapsed = time.perf_counter() - start
+    zones = rates.services[args.service][0]
+    costed = ~vectorized.np.isnan(costs[:, 0])
+    print("%d orders, %d skipped (unknown SKUs or bad quantities), %d costed (the rest need multiple packaging or are over %d lb.), in %.1f ms" %
+          (len(orders) + len(errors), len(errors), costed.sum(), rates.max_lb(args.service), elapsed * 1000))
+    for zone, index in zones.items():
+        print("zone %-4s %12.2f" % (zone, vectorized.np.nansum(costs[:, index]) / CENTS))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
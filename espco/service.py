@@ -0,0 +1,171 @@
+'''Local HTTP/JSON sizing service for the storefront and label-printing scripts, using nothing but
+the standard library:
+
+    python -m espco.service --port 8080
+
+    POST /size   {"items": {"wh_12": 1, "sauce": 1}}
+              -> {"package": "Package: Medium Box (12x12x6)", "lb": 4, "oz": 5, "weight": 69.0, "multiple": false}
+    GET /stats   requests served, p50/p99 latency, queue depth, batches and cache stats
+
+Quantities have to be whole numbers from 1 to MAX_QUANTITY, any other order is answered with a 400
+before it is queued.
+
+Requests are not sized as they come in, they go into a queue and a single task sizes everything
+waiting in the queue at once (a micro-batch), so bursts of concurrent requests cost one trip
+through the sizing loop instead of one per request.  Connections are kept alive between requests.
+Changes to the catalog file are picked up between two batches.'''
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+from . import engine
+from .batch import reload_catalog
+from .cache import SizingCache
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+MAX_QUANTITY = 10000 #most units of a SKU an order can have, more is a mistake of the script sending it
+
+class MicroBatcher():
+    '''Queue of orders waiting to be sized, sized max_batch at a time by run().'''
+    def __init__(self, sizer, max_batch = 256):
+        self.sizer = sizer
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.batched = 0
+
+    async def size_order(self, order):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((order, future))
+        return await future
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            #lets the connections that are ready add their orders before sizing the batch
+            await asyncio.sleep(0)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            reload_catalog()
+            for order, future in batch:
+                if future.cancelled():
+                    continue
+                try:
+                    future.set_result(self.sizer(order))
+                except (KeyError, TypeError, ValueError) as error:
+                    future.set_exception(error)
+            self.batches += 1
+            self.batched += len(batch)
+
+class SizingService():
+    def __init__(self, cache_size = 4096, max_batch = 256, latencies = 10000):
+        self.sizes = SizingCache(cache_size)
+        self.batcher = MicroBatcher(self.sizes.size_order, max_batch)
+        self.latencies = deque(maxlen = latencies) #seconds of the last requests, for the percentiles
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self, host, port):
+        self.batch_task = asyncio.ensure_future(self.batcher.run())
+        return await asyncio.start_server(self.handle, host, port)
+
+    def percentile(self, latencies, fraction):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        batcher = self.batcher
+        return {"requests": self.requests, "errors": self.errors, "queue_depth": batcher.queue.qsize(),
+                "batches": batcher.batches, "mean_batch_size": batcher.batched / batcher.batches if batcher.batches else 0.0,
+                "latency_ms": {"p50": self.percentile(latencies, .50), "p99": self.percentile(latencies, .99)},
+                "cache": self.sizes.stats()}
+
+    async def respond(self, method, path, body):
+        '''Returns the status and JSON answer of a request.'''
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/size":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            items = json.loads(body)["items"]
+            items.items()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {"error": 'expected {"items": {"SKU": quantity, ...}}'}
+        for sku, quantity in items.items():
+            if not engine.is_quantity(quantity) or quantity > MAX_QUANTITY:
+                return 400, {"error": "quantity of %s has to be a whole number from 1 to %d, not %s" %
+                                      (sku, MAX_QUANTITY, json.dumps(quantity))}
+        try:
+            result = await self.batcher.size_order(items)
+        except KeyError as error:
+            return 400, {"error": "unknown SKU %s" % error}
+        except (TypeError, ValueError) as error:
+            return 400, {"error": str(error)}
+        return 200, {"package": result.package, "lb": result.lb, "oz": result.oz, "weight": result.weight,
+                     "multiple": result.multiple}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                method, path, version = request_line.decode("latin-1").split(None, 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, answer = await self.respond(method, path, body)
+                data = json.dumps(answer).encode()
+                keep_alive = headers.get("connection", "").lower() != "close" and not version.startswith("HTTP/1.0")
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n"
+                             % (status, REASONS[status].encode(), len(data), b"keep-alive" if keep_alive else b"close") + data)
+                await writer.drain()
+
+                self.requests += 1
+                if status != 200:
+                    self.errors += 1
+                self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, cache_size, max_batch):
+    service = SizingService(cache_size, max_batch)
+    server = await service.start(host, port)
+    print("ESPCO sizing service on http://%s:%d" % (host, port), file = sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.service", description = "Local HTTP/JSON sizing service.")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8080)
+    parser.add_argument("--cache-size", type = int, default = 4096)
+    parser.add_argument("--max-batch", type = int, default = 256, help = "most orders sized in one batch (default 256)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache_size, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+'''Splits orders that need multiple packaging into the fewest boxes possible.
+
+Every item (button click) of the order goes whole into one of the boxes, and every box has to be an
+order the engine can size in one package (engine.select_package() doesn't say "Needs multiple
+packaging."), so the boxes are the same ones the calculator uses, Mustard Box to Case 3, with the
+same space and weight values.  Among splits with the fewest boxes, the one with the least shipped
+weight (boxes and boxes of gift boxes) is preferred:
+
+    split = split_order({"wh_24": 3, "tb_48": 2})
+    for result, skus in split.boxes:
+        print(result.package, result.lb, result.oz, skus)
+
+It is a bin packing search.  Items go in biggest first (gift boxes, then by space), and first fit
+and best fit splits are the starting answers.  If they use more boxes than the lower bound (the
+space of the order over the space of a Case 1, or the inches of gift boxes over the 24 of a Case 3),
+every other way of placing the items is tried while it can still need fewer boxes, skipping boxes
+that are in the same state and states that were already tried (memoized).  Then items are moved
+between boxes while that makes the split lighter, and every way of placing the items in as many
+boxes is tried while it can still weigh less.  A partial split is dropped once its boxes can't weigh
+less than the best split: every box weighs at least the lightest package it can still grow into
+(packages are smaller the earlier they are in engine.PACKAGES), and the boxes together at least the
+least weight a box adds per space times the space of the order.  Every placement tried or item
+moved is a step, plus a step for every box it looks at, and everything stops after STEPS steps with
+the best split found so far (under 50 ms for orders of 200 items, half of it the first fit and best
+fit splits), so an order is split the same way every time, on any computer and in any process, and
+split.optimal tells if the split is known to have the fewest boxes possible and the least weight of
+the splits with that many boxes.'''
+
+from operator import add, sub
+
+from . import engine
+
+STEPS = 15000 #boxes the search can look at before the best split found so far is given
+
+class Split():
+    '''boxes is a list of (SizingResult, [SKUs]) for every box of the split.'''
+    def __init__(self, boxes, optimal):
+        self.boxes = boxes
+        self.optimal = optimal
+
+    @property
+    def tenths(self):
+        return sum(result.tenths for result, skus in self.boxes)
+
+    def __repr__(self):
+        return "Split(%d boxes, %s)" % (len(self.boxes), ", ".join(result.package for result, skus in self.boxes))
+
+class OutOfSteps(Exception):
+    pass
+
+def _add(totals, units):
+    return tuple(map(add, totals, units))
+
+def _remove(totals, units):
+    return tuple(map(sub, totals, units))
+
+def _box(totals):
+    '''Weight (tenths of oz.) the box for the totals adds to the order, or None if it doesn't fit.'''
+    total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = totals
+    package, added = engine.select_package(total_space, gb_space, gift_box_counter, gb_box_weight, gift_boxes)
+    if package == engine.MULTIPLE_PACKAGING:
+        return None
+    return added
+
+class _Packing():
+    '''A split in progress: the totals of every box and the box of every item.'''
+    def __init__(self, items, steps, fewest):
+        self.items = items #(sku, units), gift boxes first and then biggest first
+        self.steps = steps #steps of the search left
+        self.fewest = fewest #no split can have fewer boxes
+        self.best = None #(boxes, weight, assignment)
+        self.tried = set()
+        self.added = {} #totals of a box -> _box() of them, the same totals come up again and again
+        self.gift_boxes = sum(1 for sku, units in items if units[2]) #the first items are the gift boxes
+        box_weights = engine.compiled().box_weights
+        self.lightest = min(weight for package, weight in enumerate(box_weights) if package != engine.MULTIPLE)
+        self.floors = {} #cell of the package tables -> lightest box an order in it can grow into
+        #least weight a box adds per thousandth of space of the items that are not gift boxes: every
+        #package weighs at least this much times the space limit it is given for, and the boxes have
+        #to hold the space of the whole order
+        rules = engine.compiled()
+        limits = list(zip(rules.space_limits, engine.SPACE_PACKAGES))
+        for row in engine.GIFT_BOX_TABLE:
+            limits += zip([rules.gift_box_min_space] + rules.gift_box_space_limits, row)
+        self.per_space = min(box_weights[package] / limit for limit, package in limits if limit and package != engine.MULTIPLE)
+        self.space = sum(units[0] - units[1] for sku, units in items)
+
+    def step(self, boxes):
+        '''Counts a step of the search that looks at that many boxes.'''
+        self.steps -= boxes + 1
+        if self.steps < 0:
+            raise OutOfSteps()
+
+    def box(self, totals):
+        if totals not in self.added:
+            self.added[totals] = _box(totals)
+        return self.added[totals]
+
+    def consider(self, boxes, assignment):
+        weight = sum(self.box(totals) for totals in boxes)
+        if self.best is None or (len(boxes), weight) < self.best[:2]:
+            self.best = (len(boxes), weight, list(assignment))
+
+    def floor(self, totals, position):
+        '''Least weight the box for the totals can add to the order once the items from position on
+        are placed: the lightest package further along its row and column of the package tables
+        (see inventory.Inventory.candidates()), and the boxes of its gift boxes if it has more than
+        one.  Any box at all while gift boxes are still being placed, as a second gift box moves a
+        box from the space limits to the gift box table.'''
+        if position < self.gift_boxes:
+            return self.lightest
+        total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = totals
+        cell = engine.package_cell(total_space, gb_space, gift_box_counter, gift_boxes)
+        if cell not in self.floors:
+            row, column = cell
+            if row is None:
+                packages = engine.SPACE_PACKAGES[column:]
+            else:
+                packages = [package for table_row in engine.GIFT_BOX_TABLE[row:] for package in table_row[column:]]
+            box_weights = engine.compiled().box_weights
+            self.floors[cell] = min(box_weights[package] for package in packages if package != engine.MULTIPLE)
+        return self.floors[cell] + (gb_box_weight if cell[0] is not None else 0)
+
+    def greedy(self, best_fit):
+        '''First fit puts every item in the first box it fits in, best fit in the box it fills the most.'''
+        boxes = []
+        assignment = []
+        for sku, units in self.items:
+            fits = [index for index, totals in enumerate(boxes) if self.box(_add(totals, units)) is not None]
+            if not fits:
+                boxes.append(units)
+                assignment.append(len(boxes) - 1)
+                continue
+            index = max(fits, key = lambda index: boxes[index][0]) if best_fit else fits[0]
+            boxes[index] = _add(boxes[index], units)
+            assignment.append(index)
+        self.consider(boxes, assignment)
+
+    def search(self, position, boxes, assignment, lighter = False):
+        '''Tries every placement of the items from position on that can use fewer boxes than the best
+        split so far, and returns True once a split with the fewest boxes possible is found.  With
+        lighter, tries every placement that can use as many boxes as the best split and weigh less.'''
+        self.step(len(boxes))
+        if lighter:
+            weight = max(sum(max(self.floor(totals, position), (totals[0] - totals[1]) * self.per_space) for totals in boxes),
+                         self.space * self.per_space)
+            #weights are whole tenths of oz., the small amount taken off keeps float rounding from
+            #dropping a split as heavy as the bound
+            if (max(len(boxes), self.fewest), weight - 1e-6) >= self.best[:2]:
+                return False
+        if position == len(self.items):
+            self.consider(boxes, assignment)
+            return not lighter and len(boxes) <= self.fewest
+        state = (position, tuple(sorted(boxes)))
+        if state in self.tried:
+            return False
+        self.tried.add(state)
+
+        sku, units = self.items[position]
+        #identical items go in the same box as the one before them or a later one
+        first = assignment[-1] if position and self.items[position - 1][0] == sku else 0
+        seen = set()
+        for index in range(first, len(boxes)):
+            totals = boxes[index]
+            if totals in seen:
+                continue
+            seen.add(totals)
+            new_totals = _add(totals, units)
+            if self.box(new_totals) is None:
+                continue
+            boxes[index] = new_totals
+            assignment.append(index)
+            found = self.search(position + 1, boxes, assignment, lighter)
+            assignment.pop()
+            boxes[index] = totals
+            if found:
+                return True
+        if len(boxes) + (0 if lighter else 1) < self.best[0]:
+            boxes.append(units)
+            assignment.append(len(boxes) - 1)
+            found = self.search(position + 1, boxes, assignment, lighter)
+            assignment.pop()
+            boxes.pop()
+            return found
+        return False
+
+    def lighten(self):
+        '''Moves single items to another box while that makes the split lighter.'''
+        count, weight, assignment = self.best
+        boxes = [(0,) * len(self.items[0][1])] * count
+        for (sku, units), index in zip(self.items, assignment):
+            boxes[index] = _add(boxes[index], units)
+        weights = [self.box(totals) for totals in boxes]
+        improved = True
+        while improved:
+            improved = False
+            for position, (sku, units) in enumerate(self.items):
+                self.step(count)
+                source = assignment[position]
+                left = _remove(boxes[source], units)
+                if not any(left):
+                    #boxes can't be left empty, that would be a different number of boxes
+                    continue
+                left_weight = self.box(left)
+                if left_weight is None:
+                    continue
+                for target in range(count):
+                    moved_weight = None if target == source else self.box(_add(boxes[target], units))
+                    if moved_weight is not None and left_weight + moved_weight < weights[source] + weights[target]:
+                        boxes[source], boxes[target] = left, _add(boxes[target], units)
+                        weights[source], weights[target] = left_weight, moved_weight
+                        assignment[position] = target
+                        self.best = (count, sum(weights), assignment)
+                        improved = True
+                        break
+
+def split_order(order, steps = STEPS):
+    '''Returns the Split of the order into the fewest boxes, the lightest of them.  Orders that fit
+    in one box come back as a split of one box.  Raises ValueError if a single item doesn't fit in any box.'''
+    rules = engine.compiled()
+    items = []
+    for sku in engine.skus_of(order):
+        space, gift_box_space, gift_box_code, weight, gbweight, stack = rules.products[sku]
+        #the same totals an OrderState with just this item has
+        units = (space + gift_box_space, gift_box_space, gift_box_code, weight, gbweight, stack)
+        if _box(units) is None:
+            raise ValueError("%s doesn't fit in any box" % sku)
+        items.append((sku, units))
+    if not items:
+        return Split([(engine.size_order([]), [])], True)
+    #gift boxes first (the tallest first), then the rest by space, so that once the gift boxes are in
+    #place adding an item to a box can only make it need a bigger box
+    items.sort(key = lambda item: (-item[1][2], -item[1][0], item[0]))
+
+    #no split can have fewer boxes than the space of the items that are not gift boxes over the space
+    #of the biggest box, or the inches of gift boxes over the inches of the tallest stack of gift boxes
+    space = sum(units[0] - units[1] for sku, units in items)
+    inches = sum(units[2] for sku, units in items)
+    fewest = max(1, -(-space // rules.space_limits[-1]), -(-inches // rules.gift_box_inches[-1]))
+
+    packing = _Packing(items, steps, fewest)
+    packing.greedy(best_fit = False)
+    packing.greedy(best_fit = True)
+    try:
+        if packing.best[0] > fewest:
+            packing.search(0, [], [])
+        #the lighter the split to beat, the more of the search for a lighter one is dropped
+        packing.lighten()
+        packing.tried.clear()
+        packing.search(0, [], [], lighter = True)
+        optimal = True
+    except OutOfSteps:
+        optimal = False
+
+    count, weight, assignment = packing.best
+    contents = [[] for _ in range(count)]
+    for (sku, units), index in zip(items, assignment):
+        contents[index].append(sku)
+    boxes = [(engine.size_order(skus), skus) for skus in contents]
+    return Split(boxes, optimal)
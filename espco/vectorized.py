@@ -0,0 +1,140 @@
+'''Sizes a whole batch of orders at once with NumPy (which has to be installed for this module).
+
+Every order is a linear combination of the products in the catalog, so for an N x SKU matrix
+of counts (how many times each button was clicked in each order), a single matrix product with
+the SKU x 6 matrix of product values (space, gift_box_space, gift_box_code, weight, gbweight and
+the gift box count) gives the totals of every order.  The package sizes are then found with threshold lookups over
+all the orders instead of going through the if/elif of engine.select_package() once per order:
+
+    counts = vectorized.count_matrix([{"wh_12": 1, "sauce": 1}, {"love": 2}])
+    packages, tenths = vectorized.size_matrix(counts)
+    engine.PACKAGES[packages[0]][0], tenths[0] / 10
+
+Like the engine, everything is added up in whole thousandths of space and tenths of oz. (integer
+matrices), so the results are exactly the ones engine.size_order() gives one by one.  The columns
+of a count matrix are the SKUs of the catalog in use when it is made (columns()), a matrix kept
+while the catalog is loaded again is sized with the SKUs it was made with (skus).'''
+
+import numpy as np
+
+from . import engine
+from .rates import OZ_PER_LB
+
+_columns = None #(generation, SKUs, {SKU: column}) of the catalog in use
+
+def columns():
+    '''The SKUs of the catalog in use, the columns of count matrices, and the column of every SKU,
+    made again when the rules change (see engine.generation).'''
+    global _columns
+    if _columns is None or _columns[0] != engine.generation:
+        skus = list(engine.CATALOG)
+        _columns = (engine.generation, skus, {sku: column for column, sku in enumerate(skus)})
+    return _columns[1], _columns[2]
+
+def tables():
+    '''The package tables of the engine as arrays of whole units: space limits and packages for
+    orders with no gift boxes or one gift box, and the gift box table (with a last row for over 24
+    inches) and its space limits for more than one gift box.  Also the weight each package adds to
+    the order (the boxes of the gift boxes not included).'''
+    rules = engine.compiled()
+    gift_box_table = engine.GIFT_BOX_TABLE + [[engine.MULTIPLE] * len(engine.GIFT_BOX_TABLE[0])]
+    return (np.array(rules.space_limits), np.array(engine.SPACE_PACKAGES), np.array(rules.gift_box_inches),
+            np.array(rules.gift_box_space_limits), np.array(gift_box_table), np.array(rules.box_weights))
+
+def product_matrix(skus = None):
+    '''SKU x 6 matrix of the whole units every product adds to an order (engine.Compiled.products),
+    for the SKUs of the catalog in use if no skus are given.'''
+    products = engine.compiled().products
+    return np.array([products[sku] for sku in (columns()[0] if skus is None else skus)], dtype = np.int64)
+
+def count_matrix(orders, skus = None):
+    '''N x SKU matrix of counts for a list of orders (dicts of SKU -> quantity), with a column for
+    every SKU of skus (of the catalog in use if not given).  Quantities that are not whole numbers
+    over 0 raise ValueError (see engine.check_quantity()).'''
+    if skus is None:
+        skus, index = columns()
+    else:
+        index = {sku: column for column, sku in enumerate(skus)}
+    counts = np.zeros((len(orders), len(skus)), dtype = np.int32)
+    for row, order in enumerate(orders):
+        for sku, quantity in order.items():
+            counts[row, index[sku]] += engine.check_quantity(sku, quantity)
+    return counts
+
+def check_orders(orders):
+    '''Splits (order_id, items) orders into the items of the ones count_matrix() can take and the
+    (order_id, error) of the others, with SKUs that are not in the catalog or quantities that are
+    not whole numbers over 0 (the errors batch.size_orders() gives them).'''
+    valid, errors = [], []
+    for order_id, items in orders:
+        try:
+            for sku, quantity in items.items():
+                if sku not in engine.CATALOG:
+                    raise KeyError(sku)
+                engine.check_quantity(sku, quantity)
+        except KeyError as error:
+            errors.append((order_id, "unknown SKU %s" % error))
+        except ValueError as error:
+            errors.append((order_id, str(error)))
+        else:
+            valid.append(items)
+    return valid, errors
+
+def totals(counts, skus = None):
+    '''Returns total_space, gb_space, gift_box_counter, weight, gb_box_weight and gift_boxes of every
+    order.'''
+    #whole numbers are exact in float64 (up to 2**53), and float matrix products are much faster
+    values = (counts @ product_matrix(skus).astype(float)).astype(np.int64)
+    return values[:, 0] + values[:, 1], values[:, 1], values[:, 2], values[:, 3], values[:, 4], values[:, 5]
+
+def stack_rows(gift_box_counter, gift_boxes):
+    '''Vectorized engine.stack_row(), with -1 for orders with no gift boxes or only one.'''
+    rules = engine.compiled()
+    stacks = np.array(sorted(rules.stacks), dtype = np.int64)
+    rows = np.array([-1 if rules.stacks[stack] is None else rules.stacks[stack] for stack in stacks])
+    #gift boxes over the inches of a Case 3 are the last row (MULTIPLE), every other combination is
+    #one of the stacks compiled by the engine
+    found = np.minimum(np.searchsorted(stacks, gift_boxes), len(stacks) - 1)
+    return np.where(gift_box_counter > rules.gift_box_inches[-1], len(rules.gift_box_inches), rows[found])
+
+def select_packages(total_space, gb_space, gift_box_counter, gb_box_weight, gift_boxes):
+    '''Vectorized engine.select_package(), returns the package index and added weight of every order.'''
+    space_limits, space_packages, inches, gift_box_limits, gift_box_table, box_weights = tables()
+    packages = space_packages[np.searchsorted(space_limits, total_space, side = "left")]
+
+    rules = engine.compiled()
+    row = stack_rows(gift_box_counter, gift_boxes)
+    stacked = row >= 0
+    space = total_space - gb_space
+    band = np.where(space < rules.gift_box_min_space, 0, np.searchsorted(gift_box_limits, space, side = "left") + 1)
+    packages = np.where(stacked, gift_box_table[row, band], packages)
+
+    added = box_weights[packages] + np.where(stacked, gb_box_weight, 0)
+    added[packages == engine.MULTIPLE] = 0
+    return packages, added
+
+def size_matrix(counts, skus = None):
+    '''Sizes every order (row) of an N x SKU count matrix.  Returns the package index (into
+    engine.PACKAGES) and the weight in tenths of oz. of every order (lb and oz are divmod(tenths // 10, 16)).'''
+    total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = totals(counts, skus)
+    packages, added = select_packages(total_space, gb_space, gift_box_counter, gb_box_weight, gift_boxes)
+    return packages, weight + added
+
+def billable_lbs(packages, tenths, rates):
+    '''Vectorized RateTable.billable_lb() (see rates.py) of every order.'''
+    actual = np.maximum(1, -(-tenths // (engine.WEIGHT_UNITS * OZ_PER_LB)))
+    return np.maximum(actual, np.array(rates.packages()[1])[packages])
+
+def estimate_costs(packages, tenths, rates, service):
+    '''Cost in cents of shipping every order with the service, to each zone of the service (N x
+    zones, columns in the order of the zones of the rate table).  NaN for orders that need multiple
+    packaging or are over the heaviest rate.'''
+    if service not in rates.arrays:
+        zones, by_zone = rates.services[service]
+        #a last column of NaN that every billable weight over the heaviest rate is looked up in
+        rates.arrays[service] = np.array([[np.nan] + costs[1:] + [np.nan] for costs in by_zone], dtype = float)
+    table = rates.arrays[service]
+    billable = np.minimum(billable_lbs(packages, tenths, rates), table.shape[1] - 1)
+    costs = table[:, billable].T
+    costs[packages == engine.MULTIPLE] = np.nan
+    return costs
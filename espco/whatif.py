@@ -0,0 +1,186 @@
+'''Replays a history of orders against candidate sizing rules, to see what a change to the catalog
+would do before making it (NumPy has to be installed for this module).
+
+A scenario is a change to the catalog data (see catalog.py): the keys it gives replace the ones of
+the catalog, but items, products and dimensions are merged (only the items or products given are
+replaced or added).  Scenarios come from a JSON file,
+
+    {"scenarios": [{"name": "Extra Large Box at 10.5",
+                    "catalog": {"space_limits": [0.0, 0.72, 2.42, 4.0, 6.0, 8.0, 10.5, 12.0]}}]}
+
+or are swept over a value of the catalog, given by its path (list positions by number):
+
+    python -m espco.whatif orders.csv --sweep space_limits.6=9.6:10.6:0.1 --sweep space_limits.1=.6:.9:.05
+    python -m espco.whatif orders.csv --scenarios scenarios.json -o report.json
+
+The orders are turned into a count matrix once (see vectorized.py) and saved to a temporary file
+that the workers (one per core by default) memory-map, so every worker sizes the whole history with
+the current rules once and then each scenario it is given with the same code as
+vectorized.size_matrix(), with the scenario's catalog loaded in the engine.  For every scenario it
+reports how many orders get a different package, how the mix of packages shifts, the moves from one
+package to another, and how the shipped weight changes (of the orders that go in one box with both
+rules).'''
+
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import batch, catalog, engine, vectorized
+
+CHUNK = 200000 #orders sized at a time, so the memory used doesn't grow with the history
+MERGED = ("items", "products", "dimensions") #keys of the catalog a scenario changes item by item
+
+def scenario_catalog(base, changes):
+    '''The catalog data of a scenario: base with the changes.'''
+    data = copy.deepcopy(base)
+    for key, value in changes.items():
+        if key in MERGED:
+            data.setdefault(key, {}).update(value)
+        else:
+            data[key] = value
+    return data
+
+def parse_path(path):
+    return [int(part) if part.isdigit() else part for part in path.split(".")]
+
+def sweep(base, spec):
+    '''Scenarios ({"name", "catalog"}) of a sweep "path=start:stop:step" over a value of the catalog,
+    stop included.'''
+    path, values = spec.split("=")
+    start, stop, step = (float(value) for value in values.split(":"))
+    keys = parse_path(path)
+    scenarios = []
+    for value in np.arange(start, stop + step / 2, step):
+        value = round(float(value), 6)
+        data = copy.deepcopy(base)
+        changed = data
+        for key in keys[:-1]:
+            changed = changed[key]
+        changed[keys[-1]] = value
+        scenarios.append({"name": "%s=%g" % (path, value), "catalog": {keys[0]: data[keys[0]]}})
+    return scenarios
+
+_counts = None #count matrix of the history, memory-mapped by every worker
+_skus = None #SKUs of the columns of the count matrix
+_base = None #(package names, packages, tenths) of the history with the current rules
+_base_catalog = None #catalog data of the current rules
+
+def size_history():
+    '''Sizes the whole history with the rules loaded in the engine, CHUNK orders at a time.'''
+    packages = np.empty(len(_counts), dtype = np.int64)
+    tenths = np.empty(len(_counts), dtype = np.int64)
+    for start in range(0, len(_counts), CHUNK):
+        packages[start:start + CHUNK], tenths[start:start + CHUNK] = vectorized.size_matrix(np.asarray(_counts[start:start + CHUNK]), _skus)
+    return [name for name, box in engine.PACKAGES], packages, tenths
+
+def _start_worker(counts_path, skus, base):
+    global _counts, _skus, _base, _base_catalog
+    _counts = np.load(counts_path, mmap_mode = "r")
+    _skus = skus
+    _base_catalog = base
+    engine.load_catalog(base)
+    _base = size_history()
+
+def run_scenario(scenario):
+    '''Runs in a worker: sizes the history with the catalog of the scenario and returns its diff
+    with the current rules.'''
+    start = time.perf_counter()
+    try:
+        engine.load_catalog(scenario_catalog(_base_catalog, scenario["catalog"]))
+        names, packages, tenths = size_history()
+    except (ValueError, KeyError) as error:
+        return {"name": scenario["name"], "error": str(error)}
+    finally:
+        engine.load_catalog(_base_catalog)
+    base_names, base_packages, base_tenths = _base
+    #packages of both by their place in the names of both, which are the same unless the scenario
+    #adds or takes out packages
+    all_names = base_names + [name for name in names if name not in base_names]
+    packages = np.array([all_names.index(name) for name in names])[packages]
+    changed = packages != base_packages
+    before = np.bincount(base_packages, minlength = len(all_names))
+    after = np.bincount(packages, minlength = len(all_names))
+    moves = np.bincount(base_packages[changed] * len(all_names) + packages[changed], minlength = len(all_names) ** 2)
+    one_box = (base_packages != engine.MULTIPLE) & (packages != all_names.index(engine.MULTIPLE_PACKAGING))
+    return {"name": scenario["name"], "orders": len(packages), "changed": int(changed.sum()),
+            "weight_delta_lb": float((tenths[one_box] - base_tenths[one_box]).sum()) / engine.WEIGHT_UNITS / 16,
+            "mix": {all_names[package]: [int(before[package]), int(after[package])]
+                    for package in range(len(all_names)) if before[package] != after[package]},
+            "moves": sorted(([all_names[move // len(all_names)], all_names[move % len(all_names)], int(moves[move])]
+                             for move in np.flatnonzero(moves)), key = lambda move: -move[2]),
+            "seconds": time.perf_counter() - start}
+
+def simulate(orders, scenarios, workers = None):
+    '''Replays the orders (dicts of SKU -> quantity, that vectorized.check_orders() found right)
+    against every scenario, in workers processes (every core by default).  Returns the report of
+    every scenario, in the order they were given.'''
+    base = catalog.read(engine.catalog_file)[1]
+    handle, counts_path = tempfile.mkstemp(suffix = ".npy")
+    os.close(handle)
+    try:
+        skus = vectorized.columns()[0]
+        np.save(counts_path, vectorized.count_matrix(orders, skus))
+        with ProcessPoolExecutor(workers or os.cpu_count(), initializer = _start_worker,
+                                 initargs = (counts_path, skus, base)) as executor:
+            return list(executor.map(run_scenario, scenarios))
+    finally:
+        os.remove(counts_path)
+
+def report(results, out):
+    for result in results:
+        if "error" in result:
+            print("%s: %s" % (result["name"], result["error"]), file = out)
+            continue
+        print("%s: %d of %d orders change package (%.2f%%), shipped weight %+.1f lb." %
+              (result["name"], result["changed"], result["orders"], result["changed"] * 100 / max(result["orders"], 1),
+               result["weight_delta_lb"]), file = out)
+        for name, (before, after) in result["mix"].items():
+            print("    %-40s %8d -> %8d" % (name, before, after), file = out)
+        for before, after, count in result["moves"][:5]:
+            print("    %8d from %s to %s" % (count, before, after), file = out)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m espco.whatif", description = "Replay orders against candidate sizing rules.")
+    parser.add_argument("input", help = "CSV or JSONL file with the orders (see batch.py)")
+    parser.add_argument("--input-format", choices = sorted(batch.READERS))
+    parser.add_argument("--scenarios", help = "JSON file with the scenarios")
+    parser.add_argument("--sweep", action = "append", default = [], metavar = "PATH=START:STOP:STEP",
+                        help = "scenarios for every value of the catalog value at PATH (can be repeated)")
+    parser.add_argument("--workers", type = int, help = "processes running the scenarios (default one per core)")
+    parser.add_argument("-o", "--output", help = "JSON file the report is written to")
+    args = parser.parse_args(argv)
+
+    base = catalog.read(engine.catalog_file)[1]
+    scenarios = []
+    if args.scenarios:
+        with open(args.scenarios, encoding = "utf-8") as scenarios_file:
+            scenarios += json.load(scenarios_file)["scenarios"]
+    for spec in args.sweep:
+        scenarios += sweep(base, spec)
+    if not scenarios:
+        parser.error("no scenarios, give --scenarios or --sweep")
+
+    start = time.perf_counter()
+    with open(args.input, newline = "") as source:
+        orders, errors = vectorized.check_orders(batch.READERS[batch.file_format(args.input, args.input_format)](source))
+    for order_id, error in errors:
+        print("order %s skipped: %s" % (order_id, error), file = sys.stderr)
+    read = time.perf_counter()
+    results = simulate(orders, scenarios, args.workers)
+    print("%d orders read in %.2f s (%d skipped, unknown SKUs or bad quantities), %d scenarios in %.2f s" %
+          (len(orders) + len(errors), read - start, len(errors), len(scenarios), time.perf_counter() - read), file = sys.stderr)
+    report(results, sys.stdout)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent = 2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
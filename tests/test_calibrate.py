@@ -0,0 +1,54 @@
+'''Checks that calibrate.py fits values the catalog can be loaded with.'''
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from espco import benchmark, calibrate, engine
+
+def shipments(drift = None):
+    '''A log of the benchmark's baskets shipped in the box and at the weight the engine gives, with
+    the orders drift picks out shipped one box smaller.'''
+    records = []
+    for order in benchmark.STREAMS["basket"](3000, 3) + benchmark.STREAMS["single"](1000, 3):
+        result = engine.size_order(order)
+        package = [name for name, box in engine.PACKAGES].index(result.package)
+        if drift and drift(order) and package in engine.SPACE_PACKAGES[2:-1]:
+            package = engine.SPACE_PACKAGES[engine.SPACE_PACKAGES.index(package) - 1]
+        records.append((order, engine.PACKAGE_KEYS[package], result.weight))
+    return calibrate.Shipments(records)
+
+def test_nonnegative():
+    matrix = np.array([[1.0, 1.0], [1.0, 0.0]])
+    assert np.linalg.lstsq(matrix, [1.0, 2.0], rcond = None)[0][1] < 0
+    assert np.allclose(calibrate.nonnegative(matrix, [1.0, 2.0]), [1.5, 0.0])
+
+def test_current_values_kept():
+    report = calibrate.calibrate(shipments())
+    assert not report["fitted_spaces_used"] and not report["fitted_limits_used"]
+    assert report["wrong_box"]["fitted_not_stacked"] == 0
+
+def test_fitted_values_load():
+    #orders with salts going in a smaller box say salts take less than no space
+    report = calibrate.calibrate(shipments(lambda order: any(sku.startswith(("salt", "sugar")) for sku in order)))
+    spaces = [values["fitted_space"] for values in report["items"].values() if values["fitted_space"] is not None]
+    assert min(spaces) >= 0
+    assert report["items"]["salt"]["fitted_space"] == 0
+    limits = report["fitted_space_limits"]
+    assert limits[0] == engine.SPACE_LIMITS[0]
+    assert engine.ascending([engine.space_units(limit) for limit in limits], "space_limits")
+    report["fitted_spaces_used"] = report["fitted_limits_used"] = True
+    data = calibrate.fitted_catalog(report)
+    try:
+        engine.load_catalog(data)
+        assert engine.SPACE_LIMITS == data["space_limits"]
+    finally:
+        engine.use_catalog()
+
+def test_fit_limits_ascending():
+    #every order at the same space, the limits can't all go there
+    boxes = np.array(engine.SPACE_PACKAGES[:4] * 10)
+    limits = calibrate.fit_limits(boxes, np.full(len(boxes), -0.05))
+    assert limits[0] == 0
+    assert all(limit < following for limit, following in zip(limits, limits[1:]))
+    assert limits == [round(limit, 3) for limit in limits]
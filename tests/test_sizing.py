@@ -0,0 +1,177 @@
+'''Pins what the calculator shows for some orders, and checks that every way of sizing an order
+(engine.size_order(), the precompiled DecisionTable, vectorized.size_matrix() and the running
+totals of an OrderState as the calculator adds and removes items) gives the same result.
+
+    python -m pytest tests'''
+
+import random
+
+import pytest
+
+from espco import engine
+from espco.precompiled import DecisionTable, compile_table
+
+#(order, package, lb, oz, tenths of oz.)
+BASELINE = [
+    ({"sauce": 1}, "Package: Mustard Box (6x6x4)", 0, 13, 130),
+    ({"sauce": 5}, "Package: Small Box (12x12x4)", 3, 6, 540),
+    ({"wh_12": 1}, "Package: Medium Box (12x12x6)", 3, 12, 600),
+    ({"wh_12": 2}, "Package: 12x12x10 Box", 7, 2, 1140),
+    ({"wh_12": 3}, "Package: Extra Large Box (12x12x12)", 10, 8, 1680),
+    ({"wh_12": 2, "sauce": 1}, "Package: 12x12x10 Box", 7, 11, 1230),
+    ({"tb_48": 1, "sauce": 1}, "Package: Large Box (12x12x8)", 6, 1, 970),
+    ({"tb_48": 3}, "Package: Case 1 (16x13x10)", 15, 5, 2450),
+    ({"tb_48": 3, "sauce": 1}, engine.MULTIPLE_PACKAGING, 14, 13, 2370),
+    ({"love": 1}, "Package: Small Box (12x12x4)", 1, 14, 300),
+    ({"love": 1, "tb_12": 1}, "Package: Small Box (12x12x4)", 3, 1, 490),
+    ({"merrier": 3}, "Package: Case 3 (12x12x24)", 24, 14, 3985),
+    ({"salt_sugar": 2}, "Package: Salt Envelope", 0, 4, 40),
+]
+
+#orders exactly at a space limit, and weights that adding floats used to leave a hair under a whole oz.
+#(changed by the fixed-point units of user-011)
+LIMITS = [
+    ({"sauce": 4}, "Package: Mustard Box (6x6x4)", 2, 8, 400), #0.72
+    ({"tb_48": 1}, "Package: Medium Box (12x12x6)", 5, 6, 860), #4.00
+    ({"tb_48": 1, "tb_24": 1}, "Package: Large Box (12x12x8)", 7, 14, 1260), #6.00
+    ({"tb_48": 2}, "Package: 12x12x10 Box", 10, 6, 1660), #8.00
+    ({"tb_48": 1, "tk_16": 1, "sauce": 1}, "Package: Extra Large Box (12x12x12)", 13, 3, 2110), #10.10
+    #1.00 next to two gift boxes
+    ({"love": 1, "movie_night": 1, "tb_12": 1}, "Package: Extra Large Box (12x12x12)", 7, 3, 1155),
+    ({"everyday_mega": 1, "lucky": 1, "tb_12": 1}, "Package: Case 3 (12x12x24)", 13, 3, 2115),
+    ({"love_pieces": 1, "saucy_combo": 1, "bite_2": 1}, "Package: Extra Large Box (12x12x12)", 9, 6, 1500),
+    #208.0 oz.
+    ({"bite_8": 1, "sd_24": 1, "waffle_box": 1, "waffle_single": 2}, "Package: 12x12x10 Box", 13, 0, 2080),
+    ({"sd_24": 1, "tk_12": 1, "waffle_6": 1, "waffle_box": 1, "waffle_single": 1},
+     "Package: Extra Large Box (12x12x12)", 12, 13, 2050),
+]
+
+def clicks(order):
+    '''The buttons clicked for the order, one SKU per click.'''
+    return [sku for sku, quantity in order.items() for _ in range(quantity)]
+
+def random_orders(count, seed = 11):
+    '''Orders of 1 to 12 clicks, half of them with gift boxes, some that need multiple packaging.'''
+    generator = random.Random(seed)
+    skus = list(engine.CATALOG)
+    no_gift_boxes = [sku for sku in skus if not engine.CATALOG[sku].gift_box_code]
+    orders = []
+    for _ in range(count):
+        pool = skus if generator.random() < .5 else no_gift_boxes
+        order = {}
+        for sku in generator.choices(pool, k = generator.randint(1, 12)):
+            order[sku] = order.get(sku, 0) + 1
+        orders.append(order)
+    return orders
+
+def shown(result):
+    return result.package, result.lb, result.oz, result.tenths
+
+@pytest.mark.parametrize("order, package, lb, oz, tenths", BASELINE + LIMITS)
+def test_size_order(order, package, lb, oz, tenths):
+    assert shown(engine.size_order(order)) == (package, lb, oz, tenths)
+
+@pytest.mark.parametrize("order, package, lb, oz, tenths", BASELINE + LIMITS)
+def test_adder(order, package, lb, oz, tenths):
+    #what adder() shows after every click: the result of the running totals
+    state = engine.OrderState()
+    for sku in clicks(order):
+        state.add(sku)
+    assert shown(state.result()) == (package, lb, oz, tenths)
+
+def test_click_order_does_not_matter():
+    for order, package, lb, oz, tenths in LIMITS:
+        skus = clicks(order)
+        for seed in range(5):
+            random.Random(seed).shuffle(skus)
+            assert shown(engine.size_order(skus)) == (package, lb, oz, tenths)
+
+def test_decision_table():
+    table = DecisionTable(compile_table())
+    assert table.is_current()
+    for order in [order for order, *result in BASELINE + LIMITS] + random_orders(2000):
+        assert shown(table.size_order(order)) == shown(engine.size_order(order)), order
+
+def test_vectorized():
+    vectorized = pytest.importorskip("espco.vectorized")
+    orders = [order for order, *result in BASELINE + LIMITS] + random_orders(2000)
+    packages, tenths = vectorized.size_matrix(vectorized.count_matrix(orders))
+    for order, package, order_tenths in zip(orders, packages, tenths):
+        result = engine.size_order(order)
+        assert (engine.PACKAGES[package][0], int(order_tenths)) == (result.package, result.tenths), order
+
+def test_add_remove():
+    generator = random.Random(7)
+    for order, extra in zip(random_orders(500), random_orders(500, seed = 12)):
+        #every click of the order and of extra, mixed, and then the clicks of extra taken back
+        skus = clicks(order) + clicks(extra)
+        generator.shuffle(skus)
+        state = engine.OrderState()
+        for sku in skus:
+            state.add(sku)
+        assert shown(state.result()) == shown(engine.size_order(skus))
+        for sku in clicks(extra):
+            state.remove(sku)
+        assert shown(state.result()) == shown(engine.size_order(order)), (order, extra)
+        assert state.totals() == engine.OrderState().extend(order).totals()
+
+def test_remove_missing_item():
+    state = engine.OrderState().extend({"wh_12": 1})
+    with pytest.raises(ValueError):
+        state.remove("sauce")
+    state.remove("wh_12")
+    with pytest.raises(ValueError):
+        state.remove("wh_12")
+    assert shown(state.result()) == shown(engine.size_order({}))
+
+@pytest.mark.parametrize("quantity", [0, -1, 1.5, "2", True, None])
+def test_bad_quantity(quantity):
+    with pytest.raises(ValueError):
+        engine.size_order({"wh_12": 1, "sauce": quantity})
+
+def test_check_orders():
+    vectorized = pytest.importorskip("espco.vectorized")
+    orders = [("1", {"wh_12": 1}), ("2", {"nope": 1}), ("3", {"wh_12": "x"}), ("4", {"tb_48": 2, "sauce": 0})]
+    valid, errors = vectorized.check_orders(orders)
+    assert valid == [{"wh_12": 1}]
+    assert [order_id for order_id, error in errors] == ["2", "3", "4"]
+    assert errors[0][1] == "unknown SKU 'nope'"
+
+def test_vectorized_catalog_reloaded():
+    vectorized = pytest.importorskip("espco.vectorized")
+    from espco import catalog
+    skus = vectorized.columns()[0]
+    before = vectorized.count_matrix([{"wh_12": 1}])
+    data = catalog.read(engine.catalog_file)[1]
+    data["products"]["wh_30"] = dict(data["products"]["wh_12"], name = "30 Wheelhouse", count = 30)
+    try:
+        engine.load_catalog(data)
+        orders = [{"wh_30": 1, "sauce": 1}, {"wh_12": 2}]
+        packages, tenths = vectorized.size_matrix(vectorized.count_matrix(orders))
+        for order, package, order_tenths in zip(orders, packages, tenths):
+            result = engine.size_order(order)
+            assert (engine.PACKAGES[package][0], int(order_tenths)) == (result.package, result.tenths)
+        #a matrix made before the catalog changed is sized with the SKUs it was made with
+        assert vectorized.size_matrix(before, skus)[1][0] == engine.size_order({"wh_12": 1}).tenths
+    finally:
+        engine.use_catalog()
+
+def test_decision_table_last_packages():
+    #a catalog where orders over the last limits still go in one box
+    from espco import catalog
+    data = catalog.read(engine.catalog_file)[1]
+    data["space_packages"][-1] = "case_3"
+    for row in data["gift_box_table"]:
+        row[-1] = "case_3"
+    orders = [{"tb_48": 3, "sauce": 1}, {"tb_48": 5}, {"love": 2, "tb_48": 3}, {"merrier": 4}]
+    try:
+        engine.load_catalog(data)
+        table = DecisionTable(compile_table())
+        for order in orders:
+            total_space, gb_space, gift_box_counter, weight, gb_box_weight, gift_boxes = engine.accumulate(order)
+            package = table.package(total_space, gb_space, gift_box_counter, gift_boxes)
+            assert engine.PACKAGES[package][0] == engine.size_order(order).package, order
+            assert shown(table.size_order(order)) == shown(engine.size_order(order)), order
+        assert engine.size_order({"tb_48": 5}).package == "Package: Case 3 (12x12x24)"
+    finally:
+        engine.use_catalog()
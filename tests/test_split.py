@@ -0,0 +1,48 @@
+'''Checks that split_order() gives splits the engine can size box by box, the same way every time,
+within the time it is given for orders of up to 200 items.'''
+
+import random
+import time
+
+from espco import engine
+from espco.split import split_order
+
+def random_orders(count, items, seed = 5):
+    '''Orders of that many clicks, with gift boxes only, without any and mixed.'''
+    generator = random.Random(seed)
+    skus = list(engine.CATALOG)
+    gift_boxes = [sku for sku in skus if engine.CATALOG[sku].gift_box_code]
+    pools = [skus, gift_boxes, [sku for sku in skus if sku not in gift_boxes]]
+    return [generator.choices(pools[number % len(pools)], k = items) for number in range(count)]
+
+def test_boxes_hold_the_order():
+    for items in (5, 20, 60):
+        for order in random_orders(6, items):
+            split = split_order(order)
+            assert sorted(sku for result, skus in split.boxes for sku in skus) == sorted(order)
+            for result, skus in split.boxes:
+                assert not result.multiple
+                assert engine.size_order(skus).tenths == result.tenths
+            assert split.tenths == sum(engine.size_order(skus).tenths for result, skus in split.boxes)
+
+def test_fits_in_one_box():
+    split = split_order({"wh_12": 2})
+    assert [skus for result, skus in split.boxes] == [["wh_12", "wh_12"]]
+    assert split.optimal
+
+def test_same_split_every_time():
+    for order in random_orders(3, 120):
+        first = split_order(order)
+        again = split_order(order)
+        assert [skus for result, skus in first.boxes] == [skus for result, skus in again.boxes]
+
+def test_under_50_ms():
+    for items in (20, 80, 200):
+        for order in random_orders(6, items):
+            #the fastest of a few runs, so a busy computer doesn't make the test fail
+            elapsed = []
+            for _ in range(3):
+                start = time.perf_counter()
+                split_order(order)
+                elapsed.append(time.perf_counter() - start)
+            assert min(elapsed) < .050, (items, order)